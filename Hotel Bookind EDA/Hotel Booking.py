@@ -11,15 +11,23 @@
 
 
 #Import the neccessary libraries
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import numpy as np
-import plotly.express as px
+from hotel_eda import (add_derived, bootstrap_intervals, clean_bookings, load_bookings, nightly_occupancy,
+                       report_from_frame)
+from hotel_eda.plotting import (adr_segment_room_bars, cancellations_per_month_bars, country_bar,
+                                guests_per_month_line, monthly_price_line, room_price_boxplot,
+                                segment_pie, stay_length_stackplot)
+# Every cell below runs as a named stage. Set HOTEL_EDA_PROFILE=trace.json to
+# record wall/CPU time and memory per stage and open the trace in Perfetto.
+from hotel_eda.profiling import stage
 
 # load data:
+# The loader applies an explicit schema (categoricals, small ints, float32)
+# and caches the parsed frame as Parquet, so only the first run parses the CSV.
 file_path = "hotel_bookings.csv"
-full_data = pd.read_csv(file_path)
+with stage("load") as st:
+    full_data = st.frame(load_bookings(file_path))
 
 
 # ## Data Preprocessing
@@ -39,20 +47,19 @@ full_data.isnull().sum()
 
 
 # Replace missing values:
+# Children: If none given, there were none.
 # Agent: If no agency is given, booking was most likely made without one.
 # Company: If none given, it was most likely private.
-nan_replacements = {"children:": 0.0,"country": "Unknown", "agent": 0, "company": 0}
-full_data_cln = full_data.fillna(nan_replacements)
-
 # "meal" contains values "Undefined", which is equal to SC.
-full_data_cln["meal"].replace("Undefined", "SC", inplace=True)
-
 # Some rows contain entries with 0 adults, 0 children and 0 babies. 
 # I will drop these entries with no guests.
-zero_guests = list(full_data_cln.loc[full_data_cln["adults"]
-                   + full_data_cln["children"]
-                   + full_data_cln["babies"]==0].index)
-full_data_cln.drop(full_data_cln.index[zero_guests], inplace=True)
+# The rules are declared in hotel_eda.cleaning (CLEANING_RULES) so that the chunked
+# reader (hotel_eda.streaming) cleans every chunk exactly the same way, in one pass.
+cleaning_counts = {}
+full_data_cln = clean_bookings(full_data, cleaning_counts)
+
+# How many values every rule filled or recoded, and how many rows it dropped
+cleaning_counts
 
 
 # ## Separate Resort and City Hotel
@@ -63,8 +70,13 @@ full_data_cln.drop(full_data_cln.index[zero_guests], inplace=True)
 
 # After cleaning, separate Resort and City hotel
 # To know the actual visitor numbers, only bookings that were not canceled are included. 
-rh = full_data_cln.loc[(full_data_cln["hotel"] == "Resort Hotel") & (full_data_cln["is_canceled"] == 0)]
-ch = full_data_cln.loc[(full_data_cln["hotel"] == "City Hotel") & (full_data_cln["is_canceled"] == 0)]
+# The price per person ("adr_pp") and "total_nights" are added once to the cleaned data.
+# Every table below comes from the report engine (hotel_eda.report), which splits by
+# hotel and by "stayed" inside one fused pass over the data - the same tables the
+# stats and export commands print - so the cells only pick and plot them.
+with stage("report"):
+    add_derived(full_data_cln)
+    report = report_from_frame(full_data_cln)
 
 
 # ## Number of Guests per Country
@@ -74,13 +86,8 @@ ch = full_data_cln.loc[(full_data_cln["hotel"] == "City Hotel") & (full_data_cln
 # In[5]:
 
 
-# Number of Guests per Country
-country_data = pd.DataFrame(full_data_cln.loc[full_data_cln["is_canceled"] == 0]["country"].value_counts())
-country_data.rename(columns={"count":"Number of Guests"}, inplace=True)
-
-total_guests = country_data["Number of Guests"].sum()
-country_data["Guests in %"] = round(country_data["Number of Guests"] / total_guests * 100, 2)
-country_data["country"] = country_data.index
+# Number of Guests per Country, with their share of all guests in %
+country_data = report["country_data"]
 country_data.head()
 
 
@@ -89,31 +96,20 @@ country_data.head()
 # In[6]:
 
 
-import matplotlib.pyplot as plt
-
 # Sort the data by 'Number of Guests' in descending order and select the top 22
 top_countries = country_data.sort_values(by="Number of Guests", ascending=False).head(22)
 
 # Create a bar chart
-plt.figure(figsize=(10, 6))
-plt.bar(top_countries['country'], top_countries['Number of Guests'], color='c')
-plt.title('Home Country of Guests')
-plt.xlabel('Country')
-plt.ylabel('Number of Guests')
-plt.xticks(rotation=45)  
+with stage("plot_country_bar"):
+    country_bar(top_countries, top=22)
 plt.show()
 
 
 # In[7]:
 
 
-# Explicitly creating copies of the DataFrames to avoid the warning
-rh_copy = rh.copy()
-ch_copy = ch.copy()
-
-# Now modify the copies
-rh_copy['adr_pp'] = rh_copy['adr'] / (rh_copy['adults'] + rh_copy['children'])
-ch_copy['adr_pp'] = ch_copy['adr'] / (ch_copy['adults'] + ch_copy['children'])
+# Average price per night and person of the guests of each hotel
+adr_pp_mean = report["adr_pp_mean"]
 
 
 # ## Analyzing the Average Daily Rate (ADR)
@@ -126,18 +122,20 @@ ch_copy['adr_pp'] = ch_copy['adr'] / (ch_copy['adults'] + ch_copy['children'])
 print("""From all non-cancelled bookings, across all room types and meals, the average prices are:
 Resort hotel: {:.2f} € per night and person.
 City hotel: {:.2f} € per night and person."""
-      .format(rh_copy["adr_pp"].mean(), ch_copy["adr_pp"].mean()))
+      .format(adr_pp_mean["Resort Hotel"], adr_pp_mean["City Hotel"]))
 
 
 # In[28]:
 
 
 # normalize price per night (adr):
-full_data_cln["adr_pp"] = full_data_cln["adr"] / (full_data_cln["adults"] + full_data_cln["children"])
-full_data_guests = full_data_cln.loc[full_data_cln["is_canceled"] == 0] # only actual gusts
-room_prices = full_data_guests[["hotel", "reserved_room_type", "adr_pp"]].sort_values("reserved_room_type")
+# normalized price per night (adr_pp) was added after cleaning.
+# Box plot statistics per room type and hotel from mergeable quantile sketches
+# (ROOM_PRICE_METRIC only counts actual guests), so the prices are neither
+# sorted nor handed to seaborn row by row.
+room_price_boxes = report["room_price_boxes"]
 
-room_prices.head()
+room_price_boxes.head()
 
 
 # ## Comparative Pricing Analysis Across Room Types in City and Resort Hotels
@@ -154,19 +152,9 @@ room_prices.head()
 # Ensure the styling of the plot is appealing
 sns.set(style="whitegrid")
 
-# Create a boxplot using Seaborn which is built on top of Matplotlib
-plt.figure(figsize=(10, 6))
-ax = sns.boxplot(x="reserved_room_type", y="adr_pp", hue="hotel", data=room_prices,
-                 palette="Set2", linewidth=2.5)
-
-# Customizing the plot for better readability and presentation
-plt.title("Price of Room Types per Night and Person", fontsize=16)
-plt.xlabel("Room Type", fontsize=14)
-plt.ylabel("Price [EUR]", fontsize=14)
-plt.ylim(0, 160) 
-
-# Improve legend display
-plt.legend(title="Hotel", loc='upper right', title_fontsize='13', fontsize='12')
+# Create a boxplot from the precomputed box statistics, laid out like seaborn's
+with stage("plot_room_price_boxplot"):
+    room_price_boxplot(room_price_boxes)
 
 # Show the plot
 plt.show()
@@ -182,32 +170,20 @@ plt.show()
 # In[30]:
 
 
-# grab data:
-room_prices_monthly = full_data_guests[["hotel", "arrival_date_month", "adr_pp"]].sort_values("arrival_date_month")
-
-# order by month:
-ordered_months = ["January", "February", "March", "April", "May", "June", 
-          "July", "August", "September", "October", "November", "December"]
-room_prices_monthly["arrival_date_month"] = pd.Categorical(room_prices_monthly["arrival_date_month"], categories=ordered_months, ordered=True)
+# Mean price per night and person of the actual guests for each month (in calendar order) and hotel
+grouped = report["grouped"]
 
 # Set the aesthetic style of the plots
 sns.set(style="whitegrid")
 
-# Calculate mean for each month and hotel as you already did
-grouped = room_prices_monthly.groupby(['arrival_date_month', 'hotel']).adr_pp.mean().reset_index()
-
-# Create a line plot
-plt.figure(figsize=(12, 8))
-sns.lineplot(data=grouped, x='arrival_date_month', y='adr_pp', hue='hotel', marker='o', linewidth=2.5)
-
-# Customizing the plot
-plt.title('Room Price Per Night and Person Over the Year', fontsize=16)
-plt.xlabel('Month', fontsize=14)
-plt.ylabel('Price [EUR]', fontsize=14)
-plt.xticks(rotation=45) 
+# 95% confidence intervals of the monthly means (and of the monthly
+# cancellation rates further down), from a Poisson bootstrap over counts and sums
+with stage("bootstrap_intervals"):
+    intervals = bootstrap_intervals(full_data_cln)
 
-# Customize legend
-plt.legend(title='Hotel', title_fontsize='13', fontsize='12')
+# Create a line plot straight from the monthly means, with their intervals as bands
+with stage("plot_monthly_price_line"):
+    monthly_price_line(grouped, intervals=intervals["adr_pp_per_month"])
 
 # Show the plot
 plt.show()
@@ -225,41 +201,38 @@ plt.show()
 # In[31]:
 
 
-# Count the number of guests per month for each hotel type
-guest_counts = room_prices_monthly.groupby(['hotel', 'arrival_date_month']).size().reset_index(name='guests')
-
-# Ensure the 'arrival_date_month' is still ordered correctly after groupby operation
-guest_counts['arrival_date_month'] = pd.Categorical(guest_counts['arrival_date_month'], categories=ordered_months, ordered=True)
-
-# Normalize the data for July and August from 3 years and other months from 2 years
-guest_counts.loc[guest_counts['arrival_date_month'].isin(['July', 'August']), 'guests'] /= 3
-guest_counts.loc[~guest_counts['arrival_date_month'].isin(['July', 'August']), 'guests'] /= 2
+# Number of guests per month for each hotel type, normalized by the number of
+# years every month occurs in the data (July and August from 3 years and other months from 2 years)
+guest_counts = report["guest_counts"]
 
 # Set the aesthetic style of the plots
 sns.set(style="whitegrid")
 
-# Create the plot
-plt.figure(figsize=(12, 8))
+# Create the plot (City Hotel in blue, Resort Hotel in red)
+with stage("plot_guests_per_month_line"):
+    guests_per_month_line(guest_counts)
 
-# Check if the hotel types are exactly 'City Hotel' and 'Resort Hotel'
-# Adjust the palette dictionary keys accordingly
-palette = {'City Hotel': 'blue', 'Resort Hotel': 'red'}
+# Show the plot
+plt.show()
 
-# Use seaborn to create the line plot
-# Ensure that 'hotel' column is correctly formatted as expected by the palette
-sns.lineplot(data=guest_counts, x='arrival_date_month', y='guests', hue='hotel', marker='o', linewidth=2.5, palette=palette)
 
-# Customizing the plot
-plt.title('Average Number of Hotel Guests per Month', fontsize=16)
-plt.xlabel('Month', fontsize=14)
-plt.ylabel('Number of Guests', fontsize=14)
-plt.xticks(rotation=45) 
+# ## Nightly Occupancy of City and Resort Hotels
 
-# Customize legend
-plt.legend(title='Hotel', title_fontsize='13', fontsize='12')
+# In[ ]:
 
-# Show the plot
-plt.show()
+
+# Every non-cancelled booking occupies one room from its arrival date for its total nights.
+# The occupied rooms, guests and ADR revenue of every night are computed from these stay
+# intervals directly, without expanding the bookings night by night.
+with stage("nightly_occupancy"):
+    occupancy = nightly_occupancy(full_data_cln)
+
+# Busiest night of each hotel
+busiest = occupancy.loc[occupancy.groupby("hotel", observed=True)["rooms"].idxmax()]
+print(busiest[["hotel", "night", "rooms", "guests", "adr"]].to_string(index=False))
+
+# Average occupied rooms, guests and revenue per night
+occupancy.groupby("hotel", observed=True)[["rooms", "guests", "revenue"]].mean()
 
 
 # ## Analyzing Length of Stay Trends in City and Resort Hotels
@@ -272,39 +245,12 @@ plt.show()
 # In[32]:
 
 
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-
-# Calculate 'total_nights' directly within the DataFrames
-rh_copy = rh.copy()
-ch_copy = ch.copy()
-rh_copy['total_nights'] = rh_copy['stays_in_weekend_nights'] + rh_copy['stays_in_week_nights']
-ch_copy['total_nights'] = ch_copy['stays_in_weekend_nights'] + ch_copy['stays_in_week_nights']
-
-# Calculate relative bookings in percentage
-rh_rel_bookings = rh_copy['total_nights'].value_counts(normalize=True) * 100
-ch_rel_bookings = ch_copy['total_nights'].value_counts(normalize=True) * 100
-
-# Create a DataFrame directly from the series with relative bookings
-nights_data = pd.DataFrame({
-    'Resort hotel': rh_rel_bookings,
-    'City hotel': ch_rel_bookings
-}).fillna(0).sort_index()
-
-# Prepare for plotting - ensure index is sorted and in string format for axis labels
-nights_data.index = nights_data.index.astype(str)
+# Relative bookings in percentage per number of nights and hotel (index as strings for axis labels)
+nights_data = report["nights_data"]
 
-plt.figure(figsize=(12, 8))
 # Plot a stacked area chart
-plt.stackplot(nights_data.index, nights_data['City hotel'], nights_data['Resort hotel'], labels=['City Hotel', 'Resort Hotel'], colors=['skyblue', 'salmon'])
-plt.xlabel("Number of Nights")
-plt.ylabel("Guests [%]")
-plt.title("Length of Stay by Hotel Type - Stacked Area Chart")
-plt.legend(loc='upper right')
-plt.xticks(rotation=45)  # Rotate the x-axis labels for better readability
-plt.grid(True)
-plt.xlim(-0.5, 16) 
+with stage("plot_stay_length_stackplot"):
+    stay_length_stackplot(nights_data)
 plt.show()
 
 
@@ -314,24 +260,13 @@ plt.show()
 # In[33]:
 
 
-import pandas as pd
-
-# Assuming 'rh_copy' and 'ch_copy' are your prepared DataFrame slices for Resort and City hotels, respectively
-# Calculate 'total_nights' directly within the DataFrames
-rh_copy['total_nights'] = rh_copy['stays_in_weekend_nights'] + rh_copy['stays_in_week_nights']
-ch_copy['total_nights'] = ch_copy['stays_in_weekend_nights'] + ch_copy['stays_in_week_nights']
-
-# Compute the weighted average nights stayed
-rh_avg_nights = (rh_copy['total_nights'] * rh_copy['total_nights'].value_counts(normalize=True)).sum()
-ch_avg_nights = (ch_copy['total_nights'] * ch_copy['total_nights'].value_counts(normalize=True)).sum()
-
-# Find the maximum nights stayed
-rh_max_nights = rh_copy['total_nights'].max()
-ch_max_nights = ch_copy['total_nights'].max()
+# Weighted average nights stayed (every number of nights weighted by its share of bookings)
+# and the maximum nights stayed of the guests of each hotel
+avg_nights, max_nights = report["avg_nights"], report["max_nights"]
 
 # Print results
-print(f"On average, guests of the City hotel stay {ch_avg_nights:.2f} nights, and {ch_max_nights} at maximum.")
-print(f"On average, guests of the Resort hotel stay {rh_avg_nights:.2f} nights, and {rh_max_nights} at maximum.")
+print(f"On average, guests of the City hotel stay {avg_nights['City Hotel']:.2f} nights, and {max_nights['City Hotel']} at maximum.")
+print(f"On average, guests of the Resort hotel stay {avg_nights['Resort Hotel']:.2f} nights, and {max_nights['Resort Hotel']} at maximum.")
 
 
 
@@ -344,18 +279,12 @@ print(f"On average, guests of the Resort hotel stay {rh_avg_nights:.2f} nights,
 # In[34]:
 
 
-import matplotlib.pyplot as plt
-
 # Total Bookings per market segment
-segments = full_data_cln["market_segment"].value_counts()
+segments = report["segments"]
 
 # Create a pie plot using Matplotlib
-fig, ax = plt.subplots()
-ax.pie(segments, labels=segments.index, autopct='%1.1f%%', startangle=90, colors=plt.cm.Paired(np.arange(len(segments))))
-ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-
-# Adding a title
-plt.title("Bookings per market segment")
+with stage("plot_segment_pie"):
+    segment_pie(segments)
 
 # Show the plot
 plt.show()
@@ -373,20 +302,13 @@ plt.show()
 
 
 # price per night (ADR) and person based on booking and room.
+# Mean and standard deviation per market segment and room type are computed
+# once; the bars and +/- sd error bars are drawn from that small table.
+adr_segment_room = report["adr_segment_room"]
+
 # show figure:
-plt.figure(figsize=(12, 8))
-sns.barplot(x="market_segment",
-            y="adr_pp",
-            hue="reserved_room_type",
-            data=full_data_cln,
-            errorbar="sd",
-            errwidth=1,
-            capsize=0.1)
-plt.title("ADR by market segment and room type", fontsize=16)
-plt.xlabel("Market segment", fontsize=16)
-plt.xticks(rotation=45)
-plt.ylabel("ADR per person [EUR]", fontsize=16)
-plt.legend(loc="upper left")
+with stage("plot_adr_segment_room_bars"):
+    adr_segment_room_bars(adr_segment_room)
 plt.show()
 
 
@@ -399,12 +321,11 @@ plt.show()
 # In[36]:
 
 
-# Calculate cancellations
-cancellations = full_data_cln.groupby('hotel')['is_canceled'].agg(['sum', 'count'])
-cancellations['cancel_percent'] = (cancellations['sum'] / cancellations['count']) * 100
+# Cancellations (sum), bookings (count) and cancellation rate per hotel
+cancellations = report["cancellations"]
 
 # Print results
-print(f"Total bookings canceled: {cancellations['sum'].sum()} ({(cancellations['sum'].sum() / full_data_cln.shape[0] * 100):.2f}%)")
+print(f"Total bookings canceled: {cancellations['sum'].sum()} ({(cancellations['sum'].sum() / report['total_bookings'] * 100):.2f}%)")
 print(f"Resort hotel bookings canceled: {cancellations.loc['Resort Hotel', 'sum']} ({cancellations.loc['Resort Hotel', 'cancel_percent']:.2f}%)")
 print(f"City hotel bookings canceled: {cancellations.loc['City Hotel', 'sum']} ({cancellations.loc['City Hotel', 'cancel_percent']:.2f}%)")
 
@@ -419,58 +340,13 @@ print(f"City hotel bookings canceled: {cancellations.loc['City Hotel', 'sum']} (
 # In[39]:
 
 
-# Combine the calculation of bookings and cancellations into a single operation
-hotel_data = full_data_cln.groupby(['hotel', 'arrival_date_month']).agg(
-    total_bookings=pd.NamedAgg(column='hotel', aggfunc='size'),
-    cancellations=pd.NamedAgg(column='is_canceled', aggfunc='sum')
-)
-hotel_data['cancel_percent'] = (hotel_data['cancellations'] / hotel_data['total_bookings']) * 100
-
-# Reset index to make 'hotel' and 'arrival_date_month' columns again
-hotel_data.reset_index(inplace=True)
-
-# Create ordered month category without manually redefining it in multiple places
-months_ordered = ["January", "February", "March", "April", "May", "June",
-                  "July", "August", "September", "October", "November", "December"]
-hotel_data['arrival_date_month'] = pd.Categorical(hotel_data['arrival_date_month'], categories=months_ordered, ordered=True)
-
-# Sort the data
-hotel_data.sort_values(by='arrival_date_month', inplace=True)
-
-# Create a pivot table for easier plotting of grouped bars
-pivot_table = hotel_data.pivot(index='arrival_date_month', columns='hotel', values='cancel_percent')
-
-# Set the positions of the bars on the x-axis
-ind = np.arange(len(pivot_table))  # the x locations for the groups
-width = 0.35  # the width of the bars
-
-fig, ax = plt.subplots(figsize=(14, 8))
-# Plotting bars for each hotel type
-rects1 = ax.bar(ind - width/2, pivot_table['City Hotel'], width, label='City Hotel', color='b')
-rects2 = ax.bar(ind + width/2, pivot_table['Resort Hotel'], width, label='Resort Hotel', color='r')
-
-# Add some text for labels, title, and custom x-axis tick labels, etc.
-ax.set_xlabel('Month')
-ax.set_ylabel('Cancellation Rate [%]')
-ax.set_title('Cancellations per Month')
-ax.set_xticks(ind)
-ax.set_xticklabels(pivot_table.index, rotation=45)
-ax.legend()
-
-# Add percentage values above bars for clarity
-def add_labels(bars):
-    for bar in bars:
-        height = bar.get_height()
-        ax.annotate(f'{height:.1f}%',
-                    xy=(bar.get_x() + bar.get_width() / 2, height),
-                    xytext=(0, 3),  
-                    textcoords="offset points",
-                    ha='center', va='bottom')
-
-add_labels(rects1)
-add_labels(rects2)
-
-fig.tight_layout()
+# Bookings, cancellations and cancellation rate per hotel and month, in calendar order
+hotel_data = report["hotel_data"]
+
+# Plot the cancellation rate per month as grouped bars, labelled with the percentages
+# and with the bootstrap intervals as error bars
+with stage("plot_cancellations_per_month_bars"):
+    cancellations_per_month_bars(hotel_data, intervals=intervals["cancellations_per_month"])
 
 plt.show()
 
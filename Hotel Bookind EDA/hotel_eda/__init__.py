@@ -0,0 +1,91 @@
+"""Helpers behind the Hotel Booking EDA report.
+
+The submodules are imported on first attribute access, so that
+``python -m hotel_eda --help`` and the stats-only path do not pay for
+pandas, pyarrow or the plotting libraries before they need them.
+"""
+
+import importlib
+
+# Public name -> submodule that defines it.
+_EXPORTS = {
+    "GroupStats": "aggregates",
+    "ColumnStore": "colstore",
+    "store_report": "colstore",
+    "store_stats": "colstore",
+    "write_column_store": "colstore",
+    "compare_runs": "bench",
+    "BitmapIndex": "bitmap",
+    "run_benchmark": "bench",
+    "BACKENDS": "backends",
+    "PandasBackend": "backends",
+    "PolarsBackend": "backends",
+    "check_parity": "backends",
+    "compare_tables": "backends",
+    "get_backend": "backends",
+    "BOOTSTRAP_METRICS": "bootstrap",
+    "BootstrapStats": "bootstrap",
+    "bootstrap_intervals": "bootstrap",
+    "bucket_stats": "bootstrap",
+    "stats_intervals": "bootstrap",
+    "confidence_intervals": "bootstrap",
+    "Metric": "aggregates",
+    "compute_metrics": "aggregates",
+    "CLEANING_RULES": "cleaning",
+    "CleaningRules": "cleaning",
+    "DropWhen": "cleaning",
+    "Fill": "cleaning",
+    "NAN_REPLACEMENTS": "cleaning",
+    "Recode": "cleaning",
+    "add_derived": "cleaning",
+    "clean_bookings": "cleaning",
+    "append_batch": "incremental",
+    "correct_bookings": "incremental",
+    "flip_cancellations": "incremental",
+    "init_state": "incremental",
+    "load_state": "incremental",
+    "SCHEMA": "loader",
+    "apply_schema": "loader",
+    "load_bookings": "loader",
+    "read_bookings": "loader",
+    "NightlyOccupancy": "occupancy",
+    "nightly_occupancy": "occupancy",
+    "parallel_report": "parallel",
+    "Profiler": "profiling",
+    "stage": "profiling",
+    "parallel_stats": "parallel",
+    "parallel_stats_frame": "parallel",
+    "FIGURES": "render",
+    "FIGURE_INTERVALS": "render",
+    "render_report": "render",
+    "REPORT_METRICS": "report",
+    "ReportStats": "report",
+    "build_report": "report",
+    "print_summary": "report",
+    "report_from_frame": "report",
+    "ROOM_PRICE_METRIC": "sketch",
+    "BoxSketch": "sketch",
+    "GroupSketches": "sketch",
+    "KLLSketch": "sketch",
+    "iter_clean_chunks": "streaming",
+    "BookingService": "service",
+    "serve": "service",
+    "generate_bookings": "synth",
+    "write_bookings_csv": "synth",
+    "stream_report": "streaming",
+    "stream_stats": "streaming",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,178 @@
+"""Mergeable per-group accumulators and the fused engine that fills them.
+
+A metric is declared as a Metric: the key columns to group by, an optional
+value column and whether only non-cancelled ("stayed") bookings count. For
+every group the engine keeps the number of rows and - when a value column is
+given - the count, sum and sum of squares of that value.
+
+compute_metrics evaluates a whole list of metrics in one pass: every key
+column is turned into integer codes once, the stayed mask and the value
+columns are prepared once, and each metric is then a np.bincount over the
+combined group codes. Nothing is filtered into a new frame and no pandas
+groupby runs per metric.
+
+GroupStats holds the resulting table for one metric. Two GroupStats built
+over different rows merge by adding their tables, so statistics can be
+built chunk by chunk and combined afterwards.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Metric = namedtuple("Metric", ["name", "by", "value", "stayed_only"], defaults=[None, False])
+
+# Above this many possible key combinations the group codes are compressed
+# with np.unique instead of indexing a dense bincount array.
+_DENSE_LIMIT = 1 << 22
+
+
+def _key_codes(column):
+    # Categoricals already carry their codes; everything else is factorized.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(column, sort=True)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _value_columns(column):
+    values = column.to_numpy(dtype="float64", na_value=np.nan)
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0.0)
+    return present, values, values * values
+
+
+def _group_table(by, key_codes, row_mask, value_columns):
+    codes = [key_codes[key][0] for key in by]
+    labels = [key_codes[key][1] for key in by]
+    dims = [len(label) for label in labels]
+    size = int(np.prod(dims, dtype="int64"))
+
+    # Combined group code per row. Rows outside the mask or with a missing
+    # key (left out, as in pandas' groupby) go to an extra "sink" group.
+    group = np.zeros(len(codes[0]), dtype="int64")
+    keep = np.ones(len(group), dtype=bool) if row_mask is None else row_mask.copy()
+    for code, dim in zip(codes, dims):
+        group *= dim
+        group += code
+        keep &= code >= 0
+    group[~keep] = size
+
+    used = None
+    if size > _DENSE_LIMIT:
+        # Compress to the codes that occur; the sink, if present, sorts last.
+        used, group = np.unique(group, return_inverse=True)
+        size = len(used) - int(used[-1] == size)
+
+    columns = {"n": np.bincount(group, minlength=size + 1)[:size]}
+    if value_columns is not None:
+        present, values, squares = value_columns
+        columns["count"] = np.bincount(group, weights=present, minlength=size + 1)[:size].astype("int64")
+        columns["sum"] = np.bincount(group, weights=values, minlength=size + 1)[:size]
+        columns["sumsq"] = np.bincount(group, weights=squares, minlength=size + 1)[:size]
+
+    observed = np.flatnonzero(columns["n"])
+    flat = observed if used is None else used[observed]
+    positions = np.unravel_index(flat, dims)
+    arrays = [label[position] for label, position in zip(labels, positions)]
+    if len(by) == 1:
+        index = pd.Index(arrays[0], dtype=object, name=by[0])
+    else:
+        index = pd.MultiIndex.from_arrays(arrays, names=by)
+    return pd.DataFrame({name: column[observed] for name, column in columns.items()}, index=index)
+
+
+def compute_metrics(data, metrics):
+    """Compute the tables of all metrics over a cleaned frame in one pass."""
+    key_codes, value_columns = {}, {}
+    stayed = None
+    tables = {}
+    for metric in metrics:
+        for key in metric.by:
+            if key not in key_codes:
+                key_codes[key] = _key_codes(data[key])
+        if metric.value is not None and metric.value not in value_columns:
+            value_columns[metric.value] = _value_columns(data[metric.value])
+        if metric.stayed_only and stayed is None:
+            stayed = data["is_canceled"].to_numpy() == 0
+        tables[metric.name] = _group_table(
+            list(metric.by), key_codes,
+            stayed if metric.stayed_only else None,
+            value_columns.get(metric.value),
+        )
+    return tables
+
+
+def _as_counts(table):
+    # Adding tables with fill_value turns the counts into floats.
+    counts = [column for column in ("n", "count") if column in table]
+    return table.astype({column: "int64" for column in counts})
+
+
+def _object_index(index):
+    # Keys read back from disk get typed levels; the engine builds object ones.
+    if isinstance(index, pd.MultiIndex):
+        return index.set_levels([level.astype(object) for level in index.levels])
+    return index.astype(object)
+
+
+class GroupStats:
+    """Row count and count/sum/sum of squares of a value per group of one metric."""
+
+    def __init__(self, metric):
+        self.metric = metric
+        self.table = None
+
+    def update(self, data):
+        """Add the rows of a cleaned frame (or chunk) to the statistics."""
+        self.absorb(compute_metrics(data, [self.metric])[self.metric.name])
+        return self
+
+    def merge(self, other):
+        """Fold the statistics of another GroupStats of the same metric into this one."""
+        if other.table is not None:
+            self.absorb(other.table)
+        return self
+
+    def absorb(self, table):
+        """Add a table computed by compute_metrics for this metric."""
+        if self.table is None:
+            self.table = table.copy()
+        else:
+            self.table = _as_counts(self.table.add(table, fill_value=0))
+
+    def retract(self, table):
+        """Subtract a table of rows that were absorbed before, e.g. to correct them."""
+        self.absorb(-table)
+        # Groups whose rows were all retracted disappear, as if never seen.
+        self.table = self.table.loc[self.table["n"] != 0]
+
+    def to_frame(self):
+        """The statistics as a flat frame, one column per key."""
+        return self.table.reset_index()
+
+    @classmethod
+    def from_frame(cls, metric, frame):
+        """Inverse of to_frame()."""
+        stats = cls(metric)
+        table = frame.set_index(list(metric.by))
+        table.index = _object_index(table.index)
+        stats.table = _as_counts(table)
+        return stats
+
+    def mean(self):
+        return self.table["sum"] / self.table["count"]
+
+    def std(self):
+        """Sample standard deviation (ddof=1), as pandas and seaborn use."""
+        count = self.table["count"]
+        centered = self.table["sumsq"] - self.table["sum"] ** 2 / count
+        return np.sqrt((centered / (count - 1)).clip(lower=0))
+
+    def describe(self):
+        """Count, mean and sd of the value per group, with the keys as columns."""
+        described = self.table[["count"]].copy()
+        described["mean"] = self.mean()
+        described["sd"] = self.std()
+        return described.reset_index()
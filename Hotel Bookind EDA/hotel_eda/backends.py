@@ -0,0 +1,246 @@
+"""Dataframe backends that compute the report's group tables.
+
+Every analysis of the report - cleaning, the hotel and "stayed" splits,
+guests per country, the monthly prices, guests per month, lengths of
+stay, segments, cancellations - ends in the per-group tables of
+REPORT_METRICS (row count and count/sum/sum of squares of a value, see
+hotel_eda.aggregates), from which build_report derives the tables the
+script shows. A Backend computes those tables from the bookings CSV;
+everything after them is shared, small and the same for every backend.
+
+* PandasBackend is the reference: the eager pandas path of the script
+  (load_bookings, clean_bookings, add_derived, compute_metrics).
+* PolarsBackend builds one lazy query per metric over pl.scan_csv: the
+  cleaning rules are translated from CLEANING_RULES, and only the columns
+  the metrics use are parsed. The queries share one scan of the file
+  (its projected columns are cached for them); with shared_scan=False
+  every query scans the file itself on the streaming engine, pushing its
+  "stayed" filter into the scan, so the file is never held in memory -
+  slower, for files larger than memory. It needs polars, an optional
+  dependency.
+
+check_parity compares the report of every backend with the reference,
+table by table (with compare_tables); benchmark_backends times them on the same file
+(``python -m hotel_eda backends hotel_bookings.csv``).
+"""
+
+import importlib.util
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import _object_index, compute_metrics
+from .cleaning import CleaningRules, DropWhen, Fill, add_derived, clean_bookings
+from .loader import MONTHS, SCHEMA, load_bookings
+from .report import REPORT_METRICS, ReportStats, build_report
+
+HAVE_POLARS = importlib.util.find_spec("polars") is not None
+
+# The strings pandas.read_csv reads as missing by default.
+_NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+              "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+
+class Backend:
+    """Computes the group tables of the report's metrics from the bookings CSV."""
+
+    name = None
+
+    def group_tables(self, file_path, metrics=REPORT_METRICS):
+        """{metric name: table} in the format of compute_metrics."""
+        raise NotImplementedError
+
+    def stats(self, file_path, metrics=REPORT_METRICS):
+        """ReportStats (without the room price sketches) filled from the group tables."""
+        stats = ReportStats(metrics, sketches=False)
+        for name, table in self.group_tables(file_path, metrics).items():
+            stats[name].absorb(table)
+        return stats
+
+    def report(self, file_path):
+        """The report tables, as build_report makes them."""
+        return build_report(self.stats(file_path))
+
+
+class PandasBackend(Backend):
+    """The reference: the script's eager pandas path (CSV or column store)."""
+
+    name = "pandas"
+
+    def __init__(self, cache=True):
+        self.cache = cache
+
+    def group_tables(self, file_path, metrics=REPORT_METRICS):
+        if os.path.isdir(file_path):
+            from .colstore import ColumnStore
+            data_cln = ColumnStore(file_path).frame()
+        else:
+            data_cln = add_derived(clean_bookings(load_bookings(file_path, cache=self.cache)))
+        return compute_metrics(data_cln, metrics)
+
+
+def _polars_tests(pl):
+    # The DROP_TESTS of hotel_eda.cleaning as polars expressions.
+    return {
+        "all_zero": lambda columns: pl.sum_horizontal(columns) == 0,
+        "any_negative": lambda columns: pl.any_horizontal([column < 0 for column in columns]),
+    }
+
+
+class PolarsBackend(Backend):
+    """Lazy polars queries over the CSV, run on the streaming engine."""
+
+    name = "polars"
+
+    def __init__(self, rules=None, engine="streaming", shared_scan=True):
+        if not HAVE_POLARS:
+            raise ImportError("The polars backend needs polars (pip install polars)")
+        import polars as pl
+
+        self.pl = pl
+        self.rules = rules if rules is not None else CleaningRules()
+        self.engine = engine
+        self.shared_scan = shared_scan
+        types = {"int8": pl.Int8, "int16": pl.Int16, "float32": pl.Float32}
+        self.schema = {name: types.get(str(dtype), pl.String) for name, dtype in SCHEMA.items()}
+
+    def scan(self, file_path):
+        """The cleaned bookings, with "adr_pp" and "total_nights", as a LazyFrame."""
+        if os.path.isdir(file_path):
+            raise ValueError("The polars backend reads the CSV, not a column store")
+        pl = self.pl
+        data = pl.scan_csv(file_path, schema_overrides=self.schema, null_values=_NA_VALUES)
+
+        cleaned = []
+        for name, rules in self.rules.column_rules.items():
+            column = pl.col(name)
+            for rule in rules:
+                column = column.fill_null(rule.value) if isinstance(rule, Fill) else column.replace(rule.mapping)
+            cleaned.append(column.alias(name))
+        data = data.with_columns(cleaned)
+        tests = _polars_tests(pl)
+        for rule in self.rules.rules:
+            if isinstance(rule, DropWhen):
+                columns = [pl.col(name).cast(pl.Float64) for name in rule.columns]
+                data = data.filter(~tests[rule.test](columns))
+
+        return data.with_columns(
+            adr_pp=pl.col("adr") / (pl.col("adults") + pl.col("children")),
+            total_nights=pl.col("stays_in_weekend_nights") + pl.col("stays_in_week_nights"),
+        )
+
+    def _query(self, data, metric):
+        pl = self.pl
+        if metric.stayed_only:
+            data = data.filter(pl.col("is_canceled") == 0)
+        # Rows with a missing key are left out, as in compute_metrics.
+        data = data.filter(pl.all_horizontal([pl.col(key).is_not_null() for key in metric.by]))
+        aggregations = [pl.len().alias("n")]
+        if metric.value is not None:
+            value = pl.col(metric.value).cast(pl.Float64)
+            present = value.is_not_null() & value.is_not_nan()
+            filled = pl.when(present).then(value).otherwise(0.0)
+            aggregations += [present.sum().alias("count"), filled.sum().alias("sum"),
+                             (filled * filled).sum().alias("sumsq")]
+        return data.group_by(list(metric.by)).agg(aggregations)
+
+    def group_tables(self, file_path, metrics=REPORT_METRICS):
+        data = self.scan(file_path)
+        if self.shared_scan:
+            data = data.cache()
+        results = self.pl.collect_all([self._query(data, metric) for metric in metrics], engine=self.engine)
+        return {metric.name: _to_table(metric, result) for metric, result in zip(metrics, results)}
+
+
+def _to_table(metric, result):
+    # Order the groups as compute_metrics does: months in calendar order,
+    # everything else sorted.
+    keys = pd.DataFrame({key: result[key].to_numpy() for key in metric.by})
+    order = keys.assign(**{key: pd.Categorical(keys[key], categories=MONTHS, ordered=True)
+                           for key in metric.by if key == "arrival_date_month"})
+    order = order.sort_values(list(metric.by)).index.to_numpy()
+    columns = {"n": result["n"].to_numpy().astype("int64")[order]}
+    if metric.value is not None:
+        columns["count"] = result["count"].to_numpy().astype("int64")[order]
+        columns["sum"] = result["sum"].to_numpy()[order]
+        columns["sumsq"] = result["sumsq"].to_numpy()[order]
+    if len(metric.by) == 1:
+        index = pd.Index(keys[metric.by[0]].to_numpy()[order], name=metric.by[0])
+    else:
+        index = pd.MultiIndex.from_frame(keys.iloc[order])
+    return pd.DataFrame(columns, index=_object_index(index))
+
+
+BACKENDS = {"pandas": PandasBackend, "polars": PolarsBackend}
+
+
+def available_backends():
+    """Names of the backends whose dependencies are installed."""
+    return [name for name in BACKENDS if name != "polars" or HAVE_POLARS]
+
+
+def get_backend(name, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, use one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def compare_tables(expected, actual, rtol=1e-9):
+    """None if two report tables (or numbers, or dicts of them) agree within rtol, else what differs."""
+    try:
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=rtol)
+        elif isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(expected, actual, check_exact=False, rtol=rtol)
+        elif isinstance(expected, dict):
+            if expected.keys() != actual.keys():
+                return f"keys {sorted(expected)} != {sorted(actual)}"
+            for key, value in expected.items():
+                if not math.isclose(value, actual[key], rel_tol=rtol):
+                    return f"{key}: {value!r} != {actual[key]!r}"
+        elif not math.isclose(expected, actual, rel_tol=rtol):
+            return f"{expected!r} != {actual!r}"
+    except AssertionError as error:
+        return " ".join(str(error).split())
+    return None
+
+
+def check_parity(file_path, backends=None, reference="pandas", rtol=1e-9):
+    """Compare every report table of each backend with the reference backend.
+
+    Returns one row per backend and table with whether they agree (sums may
+    differ in the last bits, as the engines add in different orders) and,
+    if not, what differs.
+    """
+    expected = get_backend(reference).report(file_path)
+    rows = []
+    for name in backends or [name for name in available_backends() if name != reference]:
+        report = get_backend(name).report(file_path)
+        for table, value in expected.items():
+            difference = compare_tables(value, report[table], rtol) if table in report else "missing"
+            rows.append({"backend": name, "table": table, "equal": difference is None,
+                         "difference": difference})
+    return pd.DataFrame(rows, columns=["backend", "table", "equal", "difference"])
+
+
+def benchmark_backends(file_path, backends=None, repeat=3):
+    """Best wall time of each backend's report over repeat runs, and its speedup over pandas."""
+    rows = []
+    for name in backends or available_backends():
+        # The pandas backend parses the CSV every time, like the others.
+        backend = get_backend(name, cache=False) if name == "pandas" else get_backend(name)
+        seconds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            backend.report(file_path)
+            seconds.append(time.perf_counter() - started)
+        rows.append({"backend": name, "seconds": min(seconds)})
+    result = pd.DataFrame(rows)
+    if "pandas" in set(result["backend"]):
+        result["speedup"] = result.loc[result["backend"] == "pandas", "seconds"].iloc[0] / result["seconds"]
+    else:
+        result["speedup"] = np.nan
+    return result
@@ -0,0 +1,160 @@
+"""Stage-by-stage benchmarks of the report pipeline.
+
+run_benchmark times every stage of the report on a CSV - loading, each
+cleaning rule, the whole cleaning, each metric, the fused aggregation, the
+sketches and each figure - and records its wall time and the peak memory
+allocated while it ran (tracemalloc, which numpy and pandas report to).
+Results are appended to a JSON lines file together with the git revision,
+the row count and library versions; compare_runs puts the latest run next
+to the previous one on the same file and flags stages that got slower.
+
+Use hotel_eda.synth to produce inputs of 1M, 10M or 100M rows. For files
+that do not fit in memory pass chunksize, which times the streamed report
+instead of the in-memory stages.
+"""
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+
+import pandas as pd
+
+from .aggregates import compute_metrics
+from .cleaning import CleaningRules, add_derived, clean_bookings
+from .loader import HAVE_PYARROW, load_bookings, read_bookings
+from .report import REPORT_METRICS, ReportStats, build_report
+from .sketch import ROOM_PRICE_METRIC, GroupSketches
+
+DEFAULT_RESULTS = "bench_results.jsonl"
+
+
+@contextlib.contextmanager
+def _measured(stage, records):
+    # Append the wall time and allocation peak of the with-block to records.
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        yield
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    records.append({"stage": stage, "seconds": seconds, "peak_bytes": peak})
+
+
+def _measure(stage, func, *args):
+    records = []
+    with _measured(stage, records):
+        result = func(*args)
+    return result, records[0]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _render_to_buffer(name, table):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from . import plotting
+    from .render import FIGURES
+
+    fig = getattr(plotting, FIGURES[name][0])(table)
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+
+def _stages(file_path, figures):
+    records = []
+
+    def measure(stage, func, *args):
+        result, record = _measure(stage, func, *args)
+        records.append(record)
+        return result
+
+    data = measure("load_csv", read_bookings, file_path)
+    if HAVE_PYARROW:
+        load_bookings(file_path)  # make sure the cache exists
+        measure("load_cached", load_bookings, file_path)
+    # Every cleaning rule on its own (through the rules' timer hook), then the whole pass.
+    CleaningRules().apply(data, timer=lambda name: _measured(f"clean:{name}", records))
+    data = measure("clean", clean_bookings, data)
+    data = measure("add_derived", add_derived, data)
+    for metric in REPORT_METRICS:
+        measure(f"metric:{metric.name}", compute_metrics, data, [metric])
+    measure("all_metrics_fused", compute_metrics, data, REPORT_METRICS)
+    measure("room_price_sketches", GroupSketches(ROOM_PRICE_METRIC).update, data)
+    stats = ReportStats().update(data)
+    report = measure("build_report", build_report, stats)
+    if figures:
+        from .render import FIGURES
+        _render_to_buffer("segment_pie", report["segments"])  # keep matplotlib's import out of the timings
+        for name, (_, table) in FIGURES.items():
+            if table in report:
+                measure(f"figure:{name}", _render_to_buffer, name, report[table])
+    return records, len(data)
+
+
+def _streamed_stages(file_path, chunksize):
+    from .streaming import stream_report
+
+    report, record = _measure("stream_report", stream_report, file_path, chunksize)
+    return [record], report["total_bookings"]
+
+
+def run_benchmark(file_path, results_path=DEFAULT_RESULTS, figures=True, chunksize=None):
+    """Benchmark every stage on file_path, append the results and return them as a frame."""
+    if chunksize:
+        records, rows = _streamed_stages(file_path, chunksize)
+    else:
+        records, rows = _stages(file_path, figures)
+    run = {
+        "run": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "file": os.path.basename(file_path),
+        "file_bytes": os.path.getsize(file_path),
+        "rows": rows,
+        "pandas": pd.__version__,
+    }
+    records = [dict(run, **record) for record in records]
+    with open(results_path, "a") as fh:
+        for record in records:
+            fh.write(json.dumps(record) + "\n")
+    return pd.DataFrame(records)
+
+
+def load_results(results_path=DEFAULT_RESULTS):
+    """All recorded benchmark results as a frame."""
+    return pd.read_json(results_path, lines=True)
+
+
+def compare_runs(results_path=DEFAULT_RESULTS, threshold=1.2):
+    """Latest run against the previous run on a file of the same size.
+
+    A stage counts as a regression when it took more than ``threshold``
+    times as long as before.
+    """
+    results = load_results(results_path)
+    latest = results.loc[results["run"] == results["run"].max()]
+    same_file = results.loc[(results["file_bytes"] == latest["file_bytes"].iloc[0])
+                            & (results["run"] < latest["run"].iloc[0])]
+    if same_file.empty:
+        raise ValueError("No earlier run on a file of the same size to compare with")
+    previous = same_file.loc[same_file["run"] == same_file["run"].max()]
+    merged = previous.set_index("stage")[["seconds", "peak_bytes"]].join(
+        latest.set_index("stage")[["seconds", "peak_bytes"]], lsuffix="_before", rsuffix="_after", how="inner")
+    merged["ratio"] = merged["seconds_after"] / merged["seconds_before"]
+    merged["regression"] = merged["ratio"] > threshold
+    return merged.reset_index()
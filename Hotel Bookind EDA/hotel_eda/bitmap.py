@@ -0,0 +1,156 @@
+"""Bitmap indexes for repeated slices on the low-cardinality columns.
+
+The analyses and the ad-hoc questions asked of the bookings slice them by
+the same few columns: hotel, is_canceled, country and market_segment.
+BitmapIndex builds, once, one bitmap per value of each of these columns;
+a slice such as "City Hotel, not canceled, from PRT, Online TA" is then
+the intersection of four bitmaps and its size a popcount, without
+scanning a column or building a frame. Over a ColumnStore frame the index
+is built straight from the memory-mapped codes.
+
+Like roaring bitmaps, each value picks the cheaper of two containers:
+values held by many rows get a dense bitmap (one bit per row, packed in
+uint64 words), rare values a sorted array of their row numbers. Dense
+bitmaps are intersected word by word; sparse row lists are intersected
+with each other and probed against the dense bitmaps. Plain numpy is
+enough for this, so no bitmap library is needed.
+"""
+
+import numpy as np
+
+from .aggregates import _key_codes
+
+INDEX_COLUMNS = ["hotel", "is_canceled", "country", "market_segment"]
+
+# A row list costs 4 bytes per row, a bitmap 1/8 byte per row of the data.
+_SPARSE_FRACTION = 1 / 32
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    def _popcount(words):
+        return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _pack(rows, n_rows):
+    bits = np.zeros(-(-n_rows // 64) * 64, dtype=bool)
+    bits[rows] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _test(words, rows):
+    # Bit i of the packed data lives in bit i % 64 of word i // 64.
+    return ((words[rows >> 6] >> (rows & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+class Selection:
+    """The rows matching a query, as a dense bitmap or a sorted row list."""
+
+    def __init__(self, n_rows, words=None, rows=None):
+        self.n_rows = n_rows
+        self.words = words
+        self.rows = rows
+
+    def count(self):
+        if self.rows is not None:
+            return len(self.rows)
+        return _popcount(self.words)
+
+    def mask(self):
+        """Boolean mask over all rows."""
+        if self.rows is not None:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[self.rows] = True
+            return mask
+        return np.unpackbits(self.words.view(np.uint8), count=self.n_rows, bitorder="little").view(bool)
+
+    def take(self, values):
+        """The selected entries of an array over all rows."""
+        return values[self.rows] if self.rows is not None else values[self.mask()]
+
+
+class BitmapIndex:
+    """Per-value bitmaps (or row lists) of a few columns of one frame."""
+
+    def __init__(self, data, columns=INDEX_COLUMNS):
+        self.data = data
+        self.n_rows = len(data)
+        self.codes = {}
+        self.containers = {}
+        for name in columns:
+            codes, labels = _key_codes(data[name])
+            self.codes[name] = {label: code for code, label in enumerate(labels)}
+            self.containers[name] = self._build(codes, len(labels))
+
+    def _build(self, codes, n_values):
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=n_values)
+        starts = np.concatenate([[0], np.cumsum(counts)]) + (codes < 0).sum()
+        containers = []
+        for code in range(n_values):
+            rows = order[starts[code]:starts[code + 1]].astype(np.int64)
+            if len(rows) < self.n_rows * _SPARSE_FRACTION:
+                containers.append(("rows", rows))
+            else:
+                containers.append(("bits", _pack(rows, self.n_rows)))
+        return containers
+
+    def _lookup(self, column, value):
+        codes = self.codes[column]
+        if value in codes:
+            return codes[value]
+        # Values typed on the command line arrive as strings.
+        for label, code in codes.items():
+            if str(label) == str(value):
+                return code
+        return None
+
+    def _container(self, column, values):
+        # Union of the containers of the values asked for; a missing value matches no row.
+        if isinstance(values, (str, int, float, np.integer)) or values is None:
+            values = [values]
+        codes = [self._lookup(column, value) for value in values]
+        parts = [self.containers[column][code] for code in codes if code is not None]
+        if not parts:
+            return "rows", np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        if all(kind == "rows" for kind, _ in parts):
+            return "rows", np.unique(np.concatenate([rows for _, rows in parts]))
+        words = np.zeros(-(-self.n_rows // 64), dtype=np.uint64)
+        for kind, part in parts:
+            words |= part if kind == "bits" else _pack(part, self.n_rows)
+        return "bits", words
+
+    def select(self, **predicates):
+        """Rows matching every predicate (column=value or column=[values])."""
+        containers = [self._container(column, values) for column, values in predicates.items()]
+        sparse = sorted((part for kind, part in containers if kind == "rows"), key=len)
+        dense = [part for kind, part in containers if kind == "bits"]
+        if sparse:
+            rows = sparse[0]
+            for other in sparse[1:]:
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            for words in dense:
+                rows = rows[_test(words, rows)]
+            return Selection(self.n_rows, rows=rows)
+        if not dense:
+            return Selection(self.n_rows, rows=np.arange(self.n_rows))
+        words = dense[0].copy()
+        for other in dense[1:]:
+            words &= other
+        return Selection(self.n_rows, words=words)
+
+    def count(self, **predicates):
+        """Number of rows matching the predicates."""
+        return self.select(**predicates).count()
+
+    def aggregate(self, value, **predicates):
+        """Count, sum and mean of a value column over the rows matching the predicates."""
+        selection = self.select(**predicates)
+        values = selection.take(self.data[value].to_numpy()).astype("float64")
+        values = values[~np.isnan(values)]
+        total = float(values.sum())
+        return {"rows": selection.count(), "count": len(values), "sum": total,
+                "mean": total / len(values) if len(values) else float("nan")}
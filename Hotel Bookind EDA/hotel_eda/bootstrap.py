@@ -0,0 +1,187 @@
+"""Bootstrap confidence intervals of the report's monthly means and rates.
+
+The monthly price per night and person and the monthly cancellation rate
+are ratios of per-group sums to per-group counts. Instead of resampling
+rows, BootstrapStats deals every row into one of ``buckets`` random buckets
+and keeps, per group and bucket, the count and the sum of the value (with
+the same fused engine as the report, see hotel_eda.aggregates). A
+replicate gives every bucket a Poisson(1) weight (or a multinomial one,
+for the classic bootstrap); its group means are then
+
+    (weights @ sums) / (weights @ counts)
+
+so a block of replicates is two matrix products over the small
+groups x buckets tables, whatever the number of rows. With as many
+buckets as rows in a group this is exactly the row-level Poisson
+bootstrap; with fewer, the buckets are random subsamples and their sums
+carry the same variance.
+
+The counting is an accumulator like the others (update, merge), so it can
+be fed chunk by chunk, and ReportStats carries one through the streamed,
+parallel and column store reports (see hotel_eda.report), in the same pass
+as the report's own statistics. bucket_stats deals the rows of a frame in
+fixed-size blocks, over a process pool with workers, and merges their
+counts. The replicates are drawn in fixed-size blocks too. Every block and
+every partition of a report has its own seed spawned from one
+SeedSequence, so the intervals are the same for any number of workers.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import GroupStats, Metric, compute_metrics
+from .loader import MONTHS
+from .profiling import stage
+
+BUCKET = "bootstrap_bucket"
+
+# Metrics whose per-group means get intervals, and the factor they are shown in.
+BOOTSTRAP_METRICS = [
+    Metric("adr_pp_per_month", ["arrival_date_month", "hotel"], "adr_pp", stayed_only=True),
+    Metric("cancellations_per_month", ["hotel", "arrival_date_month"], "is_canceled"),
+]
+SCALES = {"cancellations_per_month": 100}
+
+DEFAULT_BUCKETS = 1024
+DEFAULT_REPLICATES = 2000
+_BLOCK = 250
+# Rows dealt into buckets per block (and seed) by bucket_stats.
+_ROW_BLOCK = 1 << 18
+
+METHODS = ["poisson", "multinomial"]
+
+
+def _bucketed(metric):
+    return Metric(metric.name, [*metric.by, BUCKET], metric.value, metric.stayed_only)
+
+
+def _columns(metrics):
+    return sorted({name for metric in metrics
+                   for name in [*metric.by, metric.value, "is_canceled"] if name is not None})
+
+
+def block_seed(seed, index):
+    """The seed of block (or partition) index, spawned from seed."""
+    return np.random.SeedSequence(seed, spawn_key=(index,))
+
+
+class BootstrapStats:
+    """Count and sum of each metric's value per group and random bucket."""
+
+    def __init__(self, metrics=BOOTSTRAP_METRICS, buckets=DEFAULT_BUCKETS, seed=0):
+        self.metrics = list(metrics)
+        self.buckets = buckets
+        self.stats = {metric.name: GroupStats(_bucketed(metric)) for metric in self.metrics}
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, data_cln):
+        """Deal the rows of a cleaned frame (or chunk) into buckets and count them."""
+        with stage("bootstrap_buckets", rows=len(data_cln)):
+            frame = pd.DataFrame({name: data_cln[name] for name in _columns(self.metrics)}, copy=False)
+            bucket = self._rng.integers(self.buckets, size=len(frame), dtype=np.int32)
+            frame[BUCKET] = pd.Categorical.from_codes(bucket, categories=range(self.buckets))
+            tables = compute_metrics(frame, [_bucketed(metric) for metric in self.metrics])
+            for name, table in tables.items():
+                self.stats[name].absorb(table)
+        return self
+
+    def merge(self, other):
+        for name, stat in self.stats.items():
+            stat.merge(other.stats[name])
+        return self
+
+    def matrices(self, name):
+        """Groups (an Index) and their groups x buckets counts and sums."""
+        table = self.stats[name].table
+        counts = table["count"].unstack(BUCKET, fill_value=0)
+        sums = table["sum"].unstack(BUCKET, fill_value=0).reindex_like(counts)
+        return counts.index, counts.to_numpy(dtype="float64"), sums.to_numpy(dtype="float64")
+
+
+def _bucket_block(data, metrics, buckets, seed):
+    return BootstrapStats(metrics, buckets, seed).update(data)
+
+
+def bucket_stats(data_cln, metrics=BOOTSTRAP_METRICS, buckets=DEFAULT_BUCKETS, seed=0, workers=None):
+    """BootstrapStats of a cleaned frame, its rows counted in blocks on workers processes."""
+    # Only the columns the metrics use travel to the workers.
+    data = data_cln[_columns(metrics)]
+    blocks = [data.iloc[start:start + _ROW_BLOCK] for start in range(0, len(data), _ROW_BLOCK)]
+    args = (blocks, [metrics] * len(blocks), [buckets] * len(blocks),
+            [block_seed(seed, index) for index in range(len(blocks))])
+    if not workers or workers == 1:
+        partials = list(map(_bucket_block, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_bucket_block, *args))
+    stats = BootstrapStats(metrics, buckets, seed)
+    for partial in partials:
+        stats.merge(partial)
+    return stats
+
+
+def _replicate_block(counts, sums, replicates, seed, method):
+    # Group means of one block of replicates: replicates x groups.
+    rng = np.random.default_rng(seed)
+    n_buckets = counts.shape[1]
+    if method == "poisson":
+        weights = rng.poisson(1.0, size=(replicates, n_buckets)).astype("float64")
+    else:
+        weights = rng.multinomial(n_buckets, np.full(n_buckets, 1 / n_buckets), size=replicates).astype("float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (weights @ sums.T) / (weights @ counts.T)
+
+
+def resample(counts, sums, replicates=DEFAULT_REPLICATES, seed=0, workers=None, method="poisson"):
+    """Bootstrap replicates (replicates x groups) of sums / counts, drawn in seeded blocks."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, use one of {METHODS}")
+    sizes = [min(_BLOCK, replicates - start) for start in range(0, replicates, _BLOCK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = ([counts] * len(sizes), [sums] * len(sizes), sizes, seeds, [method] * len(sizes))
+    if not workers or workers == 1:
+        blocks = list(map(_replicate_block, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = list(pool.map(_replicate_block, *args))
+    return np.concatenate(blocks)
+
+
+def confidence_intervals(stats, name, level=0.95, replicates=DEFAULT_REPLICATES, seed=0,
+                         workers=None, method="poisson"):
+    """Estimate and percentile interval of a metric's mean per group, keys as columns."""
+    groups, counts, sums = stats.matrices(name)
+    with stage("bootstrap_resample", replicates=replicates):
+        draws = resample(counts, sums, replicates, seed, workers, method)
+    tail = (1 - level) / 2 * 100
+    lower, upper = np.nanpercentile(draws, [tail, 100 - tail], axis=0)
+    scale = SCALES.get(name, 1)
+    intervals = groups.to_frame(index=False)
+    intervals["count"] = counts.sum(axis=1).astype("int64")
+    intervals["estimate"] = sums.sum(axis=1) / counts.sum(axis=1) * scale
+    intervals["lower"] = lower * scale
+    intervals["upper"] = upper * scale
+    if "arrival_date_month" in intervals:
+        intervals["arrival_date_month"] = pd.Categorical(intervals["arrival_date_month"],
+                                                         categories=MONTHS, ordered=True)
+    keys = [key for key in ["arrival_date_month", "hotel"] if key in intervals]
+    return intervals.sort_values(keys).reset_index(drop=True)
+
+
+def stats_intervals(stats, level=0.95, replicates=DEFAULT_REPLICATES, seed=0, workers=None, method="poisson"):
+    """Confidence intervals of every metric of a filled BootstrapStats, by metric name."""
+    return {metric.name: confidence_intervals(stats, metric.name, level, replicates, seed, workers, method)
+            for metric in stats.metrics}
+
+
+def bootstrap_intervals(data_cln, metrics=BOOTSTRAP_METRICS, level=0.95, replicates=DEFAULT_REPLICATES,
+                        seed=0, workers=None, buckets=DEFAULT_BUCKETS, method="poisson"):
+    """Confidence intervals of every metric's monthly mean of a cleaned frame, by metric name.
+
+    With workers, both the counting of the rows and the replicates run on a
+    process pool.
+    """
+    stats = bucket_stats(data_cln, metrics, buckets, seed, workers)
+    return stats_intervals(stats, level, replicates, seed, workers, method)
@@ -0,0 +1,230 @@
+"""Cleaning rules shared by the in-memory report and the chunked reader.
+
+The rules are declared as data: Fill (replace missing values), Recode
+(map values to others) and DropWhen (drop the rows a test holds for).
+CleaningRules checks them against the schema once and applies all of
+them in a single pass: every touched column is computed once, the drop
+tests run on the filled values, and the cleaned frame is materialised
+once. It counts what every rule did, so the counts of a file cleaned
+chunk by chunk add up to the counts of cleaning it in one go, and can
+time every rule separately through a timer hook (the benchmark and the
+profiler use it).
+
+Every rule only looks at the row it is applied to, so cleaning a file chunk
+by chunk also gives the same rows as cleaning it in one go. Frames not
+read with the schema (e.g. by a plain pd.read_csv) are accepted too: the
+columns the rules use are cast to their schema dtype first.
+"""
+
+import contextlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .loader import SCHEMA
+from .profiling import stage
+
+Fill = namedtuple("Fill", ["column", "value"])
+Recode = namedtuple("Recode", ["column", "mapping"])
+DropWhen = namedtuple("DropWhen", ["name", "columns", "test"])
+
+# Row tests a DropWhen can use; each gets the (filled) columns as float arrays.
+DROP_TESTS = {
+    "all_zero": lambda columns: sum(columns) == 0,
+    "any_negative": lambda columns: np.logical_or.reduce([column < 0 for column in columns]),
+}
+
+CLEANING_RULES = [
+    # Replace missing values:
+    # Children: If none given, there were none.
+    # Agent: If no agency is given, booking was most likely made without one.
+    # Company: If none given, it was most likely private.
+    Fill("children", 0.0),
+    Fill("country", "Unknown"),
+    Fill("agent", 0),
+    Fill("company", 0),
+    # "meal" contains values "Undefined", which is equal to SC.
+    Recode("meal", {"Undefined": "SC"}),
+    # Some rows contain entries with 0 adults, 0 children and 0 babies.
+    DropWhen("zero_guests", ["adults", "children", "babies"], "all_zero"),
+]
+
+NAN_REPLACEMENTS = {rule.column: rule.value for rule in CLEANING_RULES if isinstance(rule, Fill)}
+
+
+def _rule_name(rule):
+    if isinstance(rule, DropWhen):
+        return f"drop:{rule.name}"
+    return f"{type(rule).__name__.lower()}:{rule.column}"
+
+
+def _is_categorical(dtype):
+    return isinstance(dtype, pd.CategoricalDtype) or dtype == "category"
+
+
+def _validate(rule, schema):
+    columns = rule.columns if isinstance(rule, DropWhen) else [rule.column]
+    for column in columns:
+        if column not in schema:
+            raise ValueError(f"{_rule_name(rule)}: no column {column!r} in the schema")
+    if isinstance(rule, Fill):
+        dtype = schema[rule.column]
+        if _is_categorical(dtype):
+            if not isinstance(rule.value, str):
+                raise ValueError(f"{_rule_name(rule)}: categorical column needs a string, not {rule.value!r}")
+        elif np.dtype(dtype).kind in "iub":
+            raise ValueError(f"{_rule_name(rule)}: {dtype} column {rule.column!r} can never be missing")
+        elif not isinstance(rule.value, (int, float)):
+            raise ValueError(f"{_rule_name(rule)}: {dtype} column needs a number, not {rule.value!r}")
+    elif isinstance(rule, Recode):
+        if not _is_categorical(schema[rule.column]):
+            raise ValueError(f"{_rule_name(rule)}: only categorical columns can be recoded")
+    elif isinstance(rule, DropWhen):
+        if rule.test not in DROP_TESTS:
+            raise ValueError(f"{_rule_name(rule)}: unknown test {rule.test!r}, use one of {sorted(DROP_TESTS)}")
+        for column in rule.columns:
+            if _is_categorical(schema[column]):
+                raise ValueError(f"{_rule_name(rule)}: {rule.test} needs numeric columns, {column!r} is not")
+    else:
+        raise TypeError(f"Not a cleaning rule: {rule!r}")
+
+
+def _no_timer(name):
+    return contextlib.nullcontext()
+
+
+def _clean_categorical(column, rules, counts, timer):
+    categories = list(column.cat.categories)
+    codes = column.cat.codes.to_numpy()
+    for rule in rules:
+        with timer(_rule_name(rule)):
+            codes = _apply_categorical(rule, categories, codes, counts)
+    dtype = pd.CategoricalDtype(categories, ordered=column.cat.ordered)
+    return pd.Categorical.from_codes(codes, dtype=dtype)
+
+
+def _apply_categorical(rule, categories, codes, counts):
+    # Apply one Fill or Recode to the codes; new target values are appended to categories.
+    targets = [rule.value] if isinstance(rule, Fill) else list(rule.mapping.values())
+    categories += [value for value in targets if value not in categories]
+    if isinstance(rule, Fill):
+        missing = codes < 0
+        counts[_rule_name(rule)] = int(missing.sum())
+        return np.where(missing, categories.index(rule.value), codes)
+    # Look up the new code of every code; -1 (missing) stays -1.
+    lookup = np.append(np.arange(len(categories)), -1)
+    for old, new in rule.mapping.items():
+        if old in categories:
+            lookup[categories.index(old)] = categories.index(new)
+    new_codes = lookup[codes]
+    counts[_rule_name(rule)] = int((new_codes != codes).sum())
+    return new_codes
+
+
+def _clean_numeric(column, rules, counts, timer):
+    values = column.to_numpy(copy=True)
+    for rule in rules:
+        with timer(_rule_name(rule)):
+            missing = np.isnan(values)
+            counts[_rule_name(rule)] = int(missing.sum())
+            values[missing] = rule.value
+    return values
+
+
+def _conform(column, dtype):
+    # The column in a dtype the rules can work on: its own, if it already has
+    # the kind of the schema dtype (categorical or numeric), else the schema's.
+    if isinstance(column.dtype, pd.CategoricalDtype) if _is_categorical(dtype) else column.dtype.kind in "iufb":
+        return column
+    try:
+        return column.astype(dtype)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"column {column.name!r} should be {dtype}, got {column.dtype} that does not "
+                         f"convert: {error}") from None
+
+
+class CleaningRules:
+    """A validated list of cleaning rules, applied to a frame in one pass."""
+
+    def __init__(self, rules=CLEANING_RULES, schema=SCHEMA):
+        for rule in rules:
+            _validate(rule, schema)
+        self.schema = schema
+        self.rules = list(rules)
+        # Fills and recodes grouped per column, in the order they were declared.
+        self.column_rules = {}
+        for rule in self.rules:
+            if not isinstance(rule, DropWhen):
+                self.column_rules.setdefault(rule.column, []).append(rule)
+        self.drops = [rule for rule in self.rules if isinstance(rule, DropWhen)]
+
+    def apply(self, data, counts=None, timer=None):
+        """Return the cleaned (chunk of the) bookings frame.
+
+        Columns no rule touches are shared with data unless rows are
+        dropped. If counts is a dict, the rows in and out and the number of
+        values or rows each rule changed are added to it. timer, if given,
+        is called with the name of every rule ("fill:children", ...) and
+        of the final "materialize" step and returns a context manager that
+        the step runs in.
+        """
+        timer = timer or _no_timer
+        used = [*self.column_rules, *(name for rule in self.drops for name in rule.columns)]
+        source = {name: _conform(data[name], self.schema[name]) for name in dict.fromkeys(used)}
+        rule_counts = {}
+        columns = {}
+        for name, rules in self.column_rules.items():
+            column = source[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                columns[name] = _clean_categorical(column, rules, rule_counts, timer)
+            else:
+                columns[name] = _clean_numeric(column, rules, rule_counts, timer)
+
+        keep = np.ones(len(data), dtype=bool)
+        for rule in self.drops:
+            with timer(_rule_name(rule)):
+                values = [np.asarray(columns.get(name, source[name]), dtype="float64") for name in rule.columns]
+                drop = DROP_TESTS[rule.test](values)
+                rule_counts[_rule_name(rule)] = int(drop.sum())
+                keep &= ~drop
+
+        with timer("materialize"):
+            cleaned = pd.DataFrame({name: columns.get(name, source.get(name, data[name])) for name in data.columns},
+                                   index=data.index, copy=False)
+            if not keep.all():
+                cleaned = cleaned.loc[keep]
+
+        if counts is not None:
+            rule_counts["rows_in"] = len(data)
+            rule_counts["rows_out"] = len(cleaned)
+            for key, value in rule_counts.items():
+                counts[key] = counts.get(key, 0) + value
+        return cleaned
+
+
+_default_rules = None
+
+
+def clean_bookings(data, counts=None, rules=None):
+    """Clean a (chunk of the) bookings frame with CLEANING_RULES or the given CleaningRules."""
+    global _default_rules
+    if rules is None:
+        if _default_rules is None:
+            _default_rules = CleaningRules()
+        rules = _default_rules
+    with stage("clean", rows=len(data)) as st:
+        return st.frame(rules.apply(data, counts, timer=_rule_stage))
+
+
+def _rule_stage(name):
+    # Every rule shows up as its own span in a profile.
+    return stage(f"clean:{name}")
+
+
+def add_derived(data):
+    """Add the price per person ("adr_pp") and "total_nights" columns in place."""
+    with stage("add_derived"):
+        data["adr_pp"] = data["adr"] / (data["adults"] + data["children"])
+        data["total_nights"] = data["stays_in_weekend_nights"] + data["stays_in_week_nights"]
+    return data
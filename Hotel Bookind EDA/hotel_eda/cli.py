@@ -0,0 +1,326 @@
+"""Command line entry point: ``python -m hotel_eda <command> [hotel_bookings.csv]``.
+
+Commands:
+
+    stats   print the report's numbers: average ADR per person, average and
+            maximum nights, cancellations
+    plots   render the report's figures to PNG/SVG files, the monthly ones
+            with bootstrap confidence intervals (see hotel_eda.render)
+    export  write the report's tables to CSV or Parquet files
+    query   count the bookings of a slice, e.g. --where hotel="City Hotel"
+            --where country=PRT, through bitmap indexes (hotel_eda.bitmap)
+    convert write the cleaned bookings as a memory-mapped column store
+            (see hotel_eda.colstore), which the other commands accept in
+            place of the CSV
+    intervals
+            print bootstrap confidence intervals of the monthly prices and
+            cancellation rates (see hotel_eda.bootstrap)
+    serve   keep the cleaned bookings in memory and answer the analyses of
+            any slice over HTTP (see hotel_eda.service)
+    backends
+            check that every dataframe backend (pandas, polars) gives the
+            same report and time them (see hotel_eda.backends)
+    synth   write a synthetic bookings CSV of any size (see hotel_eda.synth)
+    bench   time every pipeline stage and compare with the previous run
+
+Every command loads the bookings in memory through the Parquet cache by
+default, chunk by chunk with --chunksize, or over a process pool with
+--workers. ``--profile trace.json`` (before the command) records every
+stage's timings and memory for a trace viewer.
+
+Imports are deferred to the command that needs them. The stats path never
+imports matplotlib or seaborn and skips the room price sketches; its
+startup target is the cost of importing pandas alone (about 0.5 s here),
+with ``--help`` answering in well under 0.1 s.
+"""
+
+import argparse
+import json
+import math
+import os
+
+
+def _add_source_arguments(parser):
+    parser.add_argument("csv", nargs="?", default="hotel_bookings.csv",
+                        help="bookings CSV or column store directory (default: %(default)s)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--chunksize", type=int,
+                      help="stream the CSV in chunks of this many rows instead of loading it")
+    mode.add_argument("--workers", type=int,
+                      help="parse and aggregate the CSV with this many worker processes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse the CSV even if a Parquet cache exists")
+
+
+def _build_report(args, sketches, intervals=False):
+    # With intervals, the bootstrap counts are taken in the same pass (see hotel_eda.report).
+    if getattr(args, "backend", "pandas") != "pandas":
+        from .backends import get_backend
+        return get_backend(args.backend, shared_scan=not args.no_shared_scan).report(args.csv)
+    if os.path.isdir(args.csv):
+        from .colstore import store_report
+        return store_report(args.csv, args.workers, sketches=sketches, intervals=intervals)
+    if args.workers:
+        from .parallel import parallel_report
+        return parallel_report(args.csv, args.workers, sketches=sketches, intervals=intervals)
+    if args.chunksize:
+        from .streaming import stream_report
+        return stream_report(args.csv, args.chunksize, sketches=sketches, intervals=intervals)
+
+    from .cleaning import add_derived, clean_bookings
+    from .loader import load_bookings
+    from .report import report_from_frame
+    data_cln = add_derived(clean_bookings(load_bookings(args.csv, cache=not args.no_cache)))
+    return report_from_frame(data_cln, sketches=sketches, intervals=intervals)
+
+
+def _stats(args):
+    from .report import print_summary
+    if args.backend != "pandas":
+        # The other backends read the CSV themselves, in their own way.
+        flags = {"--chunksize": args.chunksize, "--workers": args.workers, "--no-cache": args.no_cache}
+        given = [flag for flag, value in flags.items() if value]
+        if given:
+            args.parser.error(f"{', '.join(given)} cannot be used with --backend {args.backend}")
+        if os.path.isdir(args.csv):
+            args.parser.error(f"--backend {args.backend} reads the CSV, not a column store")
+    elif args.no_shared_scan:
+        args.parser.error("--no-shared-scan needs --backend polars")
+    print_summary(_build_report(args, sketches=False))
+
+
+def _plots(args):
+    from .render import render_report
+    report = _build_report(args, sketches=True, intervals=not args.no_intervals)
+    status = render_report(report, args.out, formats=args.format, dpi=args.dpi, cache=not args.force,
+                           intervals=report.pop("intervals", None))
+    for name, state in status.items():
+        print(f"{state:>8}  {name}")
+
+
+def _export(args):
+    import pandas as pd
+
+    report = _build_report(args, sketches=True)
+    os.makedirs(args.out, exist_ok=True)
+    summary = {}
+    for name, value in report.items():
+        if not isinstance(value, (pd.DataFrame, pd.Series)):
+            summary[name] = value
+            continue
+        table = value.to_frame() if isinstance(value, pd.Series) else value
+        path = os.path.join(args.out, f"{name}.{args.format}")
+        if args.format == "parquet":
+            table.to_parquet(path)
+        else:
+            if "fliers" in table:
+                table = table.assign(fliers=[" ".join(f"{v:g}" for v in fliers) for fliers in table["fliers"]])
+            table.to_csv(path)
+        print(path)
+    path = os.path.join(args.out, "summary.json")
+    with open(path, "w") as fh:
+        json.dump(summary, fh, indent=2, default=float)
+    print(path)
+
+
+def _load_cleaned(args):
+    if os.path.isdir(args.csv):
+        from .colstore import ColumnStore
+        return ColumnStore(args.csv).frame()
+    from .cleaning import add_derived, clean_bookings
+    from .loader import load_bookings
+    return add_derived(clean_bookings(load_bookings(args.csv, cache=not args.no_cache)))
+
+
+def _query(args):
+    from .bitmap import BitmapIndex
+
+    predicates = {}
+    for condition in args.where:
+        column, equals, values = condition.partition("=")
+        values = values.split(",")
+        if not column or not equals or "" in values:
+            args.parser.error(f"--where {condition!r}: expected COLUMN=VALUE[,VALUE...]")
+        predicates[column] = values
+    data = _load_cleaned(args)
+    for column in [*predicates, *([args.value] if args.value else [])]:
+        if column not in data:
+            args.parser.error(f"unknown column {column!r}; the bookings have {', '.join(data.columns)}")
+    index = BitmapIndex(data, columns=list(predicates))
+    if args.value:
+        result = index.aggregate(args.value, **predicates)
+        # The mean of an empty slice is NaN, which is not valid JSON.
+        print(json.dumps({key: value if math.isfinite(value) else None for key, value in result.items()},
+                         allow_nan=False))
+    else:
+        print(index.count(**predicates))
+
+
+def _convert(args):
+    from .colstore import write_column_store
+    try:
+        print(write_column_store(args.csv, args.out, chunksize=args.chunksize))
+    except FileExistsError as error:
+        args.parser.error(str(error))
+
+
+def _intervals(args):
+    from .bootstrap import bootstrap_intervals
+
+    intervals = bootstrap_intervals(_load_cleaned(args), level=args.level, replicates=args.replicates,
+                                    seed=args.seed, workers=args.workers, method=args.method)
+    for name, table in intervals.items():
+        print(f"{name}:\n{table.to_string(index=False, float_format='{:.2f}'.format)}\n")
+
+
+def _serve(args):
+    from .service import serve
+    try:
+        serve(args.csv, args.host, args.port, args.socket, args.cache_size, args.reload_interval)
+    except FileExistsError as error:
+        args.parser.error(str(error))
+
+
+def _backends(args):
+    from .backends import benchmark_backends, check_parity
+
+    parity = check_parity(args.csv, args.backend, rtol=args.rtol)
+    print(parity[["backend", "table", "equal"]].to_string(index=False))
+    for row in parity.loc[~parity["equal"]].itertuples():
+        print(f"\n{row.backend} {row.table}: {row.difference}")
+    if not args.no_bench:
+        print()
+        print(benchmark_backends(args.csv, ["pandas"] + list(parity["backend"].unique()), args.repeat)
+              .to_string(index=False))
+    if not parity["equal"].all():
+        raise SystemExit(1)
+
+
+def _synth(args):
+    from .synth import write_bookings_csv
+    print(write_bookings_csv(args.out, args.rows, seed=args.seed))
+
+
+def _bench(args):
+    from .bench import compare_runs, run_benchmark
+
+    results = run_benchmark(args.csv, args.results, figures=not args.no_figures, chunksize=args.chunksize)
+    print(results[["stage", "seconds", "peak_bytes"]].to_string(index=False))
+    try:
+        comparison = compare_runs(args.results, args.threshold)
+    except ValueError:
+        return
+    regressions = comparison.loc[comparison["regression"]]
+    if not regressions.empty:
+        print("\nSlower than the previous run:")
+        print(regressions[["stage", "seconds_before", "seconds_after", "ratio"]].to_string(index=False))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m hotel_eda",
+                                     description="Hotel Booking EDA report without the notebook.")
+    parser.add_argument("--profile", metavar="TRACE_JSON",
+                        help="write per-stage timings and memory as a Chrome trace (see hotel_eda.profiling)")
+    parser.add_argument("--profile-allocations", action="store_true",
+                        help="also trace allocations with tracemalloc (slower)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser("stats", help="print the report's numbers")
+    _add_source_arguments(stats)
+    stats.add_argument("--backend", default="pandas", choices=["pandas", "polars"],
+                       help="dataframe engine that aggregates the bookings (see hotel_eda.backends)")
+    stats.add_argument("--no-shared-scan", action="store_true",
+                       help="polars: scan the file once per query on the streaming engine instead of "
+                            "caching it, for files larger than memory")
+    stats.set_defaults(run=_stats, parser=stats)
+
+    plots = commands.add_parser("plots", help="render the report's figures to files")
+    _add_source_arguments(plots)
+    plots.add_argument("--out", default="figures", help="output directory (default: %(default)s)")
+    plots.add_argument("--format", nargs="+", default=["png", "svg"], choices=["png", "svg", "pdf"])
+    plots.add_argument("--dpi", type=int, default=100)
+    plots.add_argument("--force", action="store_true", help="render figures even if they are unchanged")
+    plots.add_argument("--no-intervals", action="store_true",
+                       help="leave out the bootstrap confidence intervals of the monthly figures")
+    plots.set_defaults(run=_plots)
+
+    export = commands.add_parser("export", help="write the report's tables to files")
+    _add_source_arguments(export)
+    export.add_argument("--out", default="report", help="output directory (default: %(default)s)")
+    export.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    export.set_defaults(run=_export)
+
+    query = commands.add_parser("query", help="count (and aggregate) the bookings of a slice")
+    query.add_argument("csv", nargs="?", default="hotel_bookings.csv",
+                       help="bookings CSV or column store directory (default: %(default)s)")
+    query.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE[,VALUE...]",
+                       help="keep rows whose column has one of the values; repeat to combine")
+    query.add_argument("--value", help="also give count, sum and mean of this column over the slice")
+    query.add_argument("--no-cache", action="store_true")
+    query.set_defaults(run=_query, parser=query)
+
+    convert = commands.add_parser("convert", help="convert the CSV into a memory-mapped column store")
+    convert.add_argument("csv", nargs="?", default="hotel_bookings.csv")
+    convert.add_argument("--out", default="hotel_bookings.store", help="store directory (default: %(default)s)")
+    convert.add_argument("--chunksize", type=int, default=500_000)
+    convert.set_defaults(run=_convert, parser=convert)
+
+    intervals = commands.add_parser("intervals", help="bootstrap confidence intervals of the monthly metrics")
+    intervals.add_argument("csv", nargs="?", default="hotel_bookings.csv",
+                           help="bookings CSV or column store directory (default: %(default)s)")
+    intervals.add_argument("--level", type=float, default=0.95)
+    intervals.add_argument("--replicates", type=int, default=2000)
+    intervals.add_argument("--method", default="poisson", choices=["poisson", "multinomial"])
+    intervals.add_argument("--seed", type=int, default=0)
+    intervals.add_argument("--workers", type=int,
+                           help="count the rows and draw the replicates on this many processes")
+    intervals.add_argument("--no-cache", action="store_true")
+    intervals.set_defaults(run=_intervals)
+
+    serve = commands.add_parser("serve", help="answer the analyses of any slice over HTTP")
+    serve.add_argument("csv", nargs="?", default="hotel_bookings.csv",
+                       help="bookings CSV or column store directory (default: %(default)s)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8050)
+    serve.add_argument("--socket", help="listen on this Unix socket instead of a TCP port")
+    serve.add_argument("--cache-size", type=int, default=256,
+                       help="slices whose results are kept (default: %(default)s)")
+    serve.add_argument("--reload-interval", type=float, default=5.0,
+                       help="seconds between checks of the source for changes; 0 never reloads")
+    serve.set_defaults(run=_serve, parser=serve)
+
+    backends = commands.add_parser("backends", help="compare the dataframe backends' reports and speed")
+    backends.add_argument("csv", nargs="?", default="hotel_bookings.csv")
+    backends.add_argument("--backend", nargs="+", help="backends to check against pandas (default: all installed)")
+    backends.add_argument("--rtol", type=float, default=1e-9,
+                          help="relative tolerance of the comparison (default: %(default)s)")
+    backends.add_argument("--repeat", type=int, default=3)
+    backends.add_argument("--no-bench", action="store_true", help="only check that the reports agree")
+    backends.set_defaults(run=_backends)
+
+    synth = commands.add_parser("synth", help="write a synthetic bookings CSV")
+    synth.add_argument("--rows", type=int, default=1_000_000)
+    synth.add_argument("--seed", type=int, default=0)
+    synth.add_argument("--out", default="synthetic_bookings.csv")
+    synth.set_defaults(run=_synth)
+
+    bench = commands.add_parser("bench", help="time and measure every pipeline stage")
+    bench.add_argument("csv", nargs="?", default="hotel_bookings.csv")
+    bench.add_argument("--results", default="bench_results.jsonl",
+                       help="JSON lines file the results are appended to (default: %(default)s)")
+    bench.add_argument("--chunksize", type=int,
+                       help="time the streamed report only, for files larger than memory")
+    bench.add_argument("--no-figures", action="store_true")
+    bench.add_argument("--threshold", type=float, default=1.2,
+                       help="flag stages this many times slower than the previous run")
+    bench.set_defaults(run=_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        from .profiling import enable
+        enable(args.profile, trace_allocations=args.profile_allocations)
+    args.run(args)
+    return 0
@@ -0,0 +1,226 @@
+"""Memory-mapped, dictionary-encoded column store of the cleaned bookings.
+
+write_column_store converts hotel_bookings.csv once, chunk by chunk, into a
+directory with one flat binary file per column of the cleaned bookings
+(derived "adr_pp" and "total_nights" included) and a manifest.json:
+
+* numeric columns are stored in their schema dtype;
+* string columns (hotel, country, market_segment, reserved_room_type, ...)
+  and the "agent" and "company" ids are dictionary-encoded: the file holds
+  small integer codes (-1 for missing) and the manifest the dictionary.
+  The codes use the integer width pandas uses for that many categories, so
+  they become Categorical columns without being copied.
+
+ColumnStore.frame() maps the files read-only and wraps them in a DataFrame
+without copying, so the usual analyses (compute_metrics, ReportStats,
+BitmapIndex, ...) read straight from the page cache. Every process
+that opens the store - store_stats' workers, repeated runs - shares the
+same pages instead of parsing and holding its own copy of the data. Only
+"agent" and "company" are decoded back to float ids, into memory, when
+they are asked for.
+"""
+
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .loader import SCHEMA_VERSION, file_digest
+from .parallel import _bootstrap_seeds, _merge_all, _partition_stats
+from .report import build_report
+from .streaming import DEFAULT_CHUNKSIZE, iter_clean_chunks
+
+STORE_VERSION = 1
+
+# Numeric ids that are dictionary-encoded on disk and decoded to floats.
+DICTIONARY_COLUMNS = ["agent", "company"]
+
+_MANIFEST = "manifest.json"
+
+
+def _code_dtype(n_categories):
+    # The width pandas picks for Categorical codes (see coerce_indexer_dtype).
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class _Dictionary:
+    """Global dictionary of one column, grown chunk by chunk."""
+
+    def __init__(self, values=(), ordered=False):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        self.ordered = ordered
+
+    def encode(self, series):
+        cat = series.array if isinstance(series.dtype, pd.CategoricalDtype) else pd.Categorical(series)
+        for value in cat.categories:
+            if value not in self.codes:
+                self.codes[value] = len(self.values)
+                self.values.append(value)
+        mapping = np.array([self.codes[value] for value in cat.categories] + [-1], dtype=np.int32)
+        # Missing values have code -1, which picks the trailing -1 of mapping.
+        return mapping[cat.codes]
+
+
+def _jsonable(values):
+    return [value.item() if hasattr(value, "item") else value for value in values]
+
+
+def _check_replaceable(path, partial=False):
+    # Only a missing or empty directory or an earlier store may be replaced;
+    # with partial, also the column files of an interrupted conversion.
+    if not os.path.lexists(path):
+        return
+    if not os.path.isdir(path) or os.path.islink(path):
+        raise FileExistsError(f"{path} exists and is not a column store directory; not replacing it")
+    entries = os.listdir(path)
+    if partial and all(entry.endswith(".bin") or entry == _MANIFEST for entry in entries):
+        return
+    if entries and _MANIFEST not in entries:
+        raise FileExistsError(f"{path} is not empty and has no {_MANIFEST}, so it is not a column store; "
+                              f"not replacing it")
+
+
+def write_column_store(file_path, store_dir, chunksize=DEFAULT_CHUNKSIZE):
+    """Convert the bookings CSV into a column store of the cleaned bookings at store_dir.
+
+    store_dir (and the store_dir + ".tmp" it is written to first) must be
+    missing, empty or an earlier column store; anything else raises
+    FileExistsError instead of being deleted.
+    """
+    tmp_dir = store_dir.rstrip(os.sep) + ".tmp"
+    _check_replaceable(store_dir)
+    _check_replaceable(tmp_dir, partial=True)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns, dictionaries, files, cleaning = {}, {}, {}, {}
+    rows = 0
+    try:
+        for chunk in iter_clean_chunks(file_path, chunksize, cleaning):
+            for name in chunk.columns:
+                series = chunk[name]
+                if name not in columns:
+                    if isinstance(series.dtype, pd.CategoricalDtype) or name in DICTIONARY_COLUMNS:
+                        ordered = isinstance(series.dtype, pd.CategoricalDtype) and series.cat.ordered
+                        # Ordered categories (the months) keep their full, fixed order.
+                        dictionaries[name] = _Dictionary(series.cat.categories if ordered else (), ordered)
+                        columns[name] = {"kind": "dictionary", "decode": None if name not in DICTIONARY_COLUMNS
+                                         else str(series.dtype)}
+                    else:
+                        columns[name] = {"kind": "numeric", "dtype": str(series.dtype)}
+                    files[name] = open(os.path.join(tmp_dir, f"{name}.bin"), "wb")
+                if name in dictionaries:
+                    values = dictionaries[name].encode(series)
+                else:
+                    values = series.to_numpy(dtype=columns[name]["dtype"])
+                files[name].write(np.ascontiguousarray(values).tobytes())
+            rows += len(chunk)
+    finally:
+        for fh in files.values():
+            fh.close()
+
+    # The codes were written as int32; narrow them now that the dictionaries are complete.
+    for name, dictionary in dictionaries.items():
+        path = os.path.join(tmp_dir, f"{name}.bin")
+        dtype = _code_dtype(len(dictionary.values))
+        np.fromfile(path, dtype=np.int32).astype(dtype).tofile(path)
+        columns[name].update(dtype=str(dtype), dictionary=_jsonable(dictionary.values),
+                             ordered=dictionary.ordered)
+
+    stat = os.stat(file_path)
+    manifest = {
+        "store_version": STORE_VERSION,
+        "schema_version": SCHEMA_VERSION,
+        "rows": rows,
+        "source": {"path": os.path.abspath(file_path), "size": stat.st_size,
+                   "mtime_ns": stat.st_mtime_ns, "hash": file_digest(file_path)},
+        "cleaning": cleaning,
+        "columns": columns,
+    }
+    with open(os.path.join(tmp_dir, _MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=1)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return store_dir
+
+
+class ColumnStore:
+    """Read-only view of a column store written by write_column_store."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, _MANIFEST)) as fh:
+            self.manifest = json.load(fh)
+        if self.manifest.get("store_version") != STORE_VERSION:
+            raise ValueError(f"{store_dir!r} was written by another version; convert the CSV again")
+        self.rows = self.manifest["rows"]
+        self.columns = list(self.manifest["columns"])
+        self._arrays = {}
+
+    def is_current(self, file_path):
+        """Whether the store was converted from file_path as it is now."""
+        source = self.manifest["source"]
+        stat = os.stat(file_path)
+        return (source["size"] == stat.st_size
+                and (source["mtime_ns"] == stat.st_mtime_ns or source["hash"] == file_digest(file_path)))
+
+    def array(self, name):
+        """The raw memory-mapped values (codes for dictionary columns) of a column."""
+        if name not in self._arrays:
+            dtype = np.dtype(self.manifest["columns"][name]["dtype"])
+            if self.rows:
+                path = os.path.join(self.store_dir, f"{name}.bin")
+                self._arrays[name] = np.memmap(path, dtype=dtype, mode="r", shape=(self.rows,))
+            else:
+                self._arrays[name] = np.empty(0, dtype=dtype)
+        return self._arrays[name]
+
+    def column(self, name, start=None, stop=None):
+        """One column (or a row range of it) as pandas values, without copying where possible."""
+        spec = self.manifest["columns"][name]
+        values = self.array(name)[start:stop]
+        if spec["kind"] == "numeric":
+            return values
+        dictionary = spec["dictionary"]
+        if spec["decode"]:
+            # Numeric ids: a trailing NaN turns code -1 into a missing value.
+            return np.asarray(dictionary + [np.nan], dtype=spec["decode"])[values]
+        return pd.Categorical.from_codes(values, categories=dictionary, ordered=spec["ordered"])
+
+    def frame(self, columns=None, start=None, stop=None):
+        """A DataFrame over the store's pages for the given columns and row range."""
+        names = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.column(name, start, stop) for name in names}, copy=False)
+
+
+def _stats_of_rows(store_dir, start, stop, sketches, bootstrap_seed=None):
+    return _partition_stats(sketches, bootstrap_seed).update(ColumnStore(store_dir).frame(start=start, stop=stop))
+
+
+def store_stats(store_dir, workers=None, sketches=True, partition_rows=1 << 20, intervals=False):
+    """ReportStats of a column store; with workers, row ranges go to a process pool.
+
+    The workers map the same files, so they share one copy of the data in the
+    page cache and only send back their partial statistics.
+    """
+    rows = ColumnStore(store_dir).rows
+    if not workers or workers == 1:
+        return _stats_of_rows(store_dir, None, None, sketches, _bootstrap_seeds(1, intervals)[0])
+    bounds = list(range(0, rows, partition_rows)) + [rows]
+    starts, stops = bounds[:-1], bounds[1:]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = pool.map(_stats_of_rows, [store_dir] * len(starts), starts, stops, [sketches] * len(starts),
+                            _bootstrap_seeds(len(starts), intervals))
+        return _merge_all(partials, sketches, intervals)
+
+
+def store_report(store_dir, workers=None, sketches=True, intervals=False):
+    """The report tables of a column store."""
+    return build_report(store_stats(store_dir, workers, sketches, intervals=intervals))
@@ -0,0 +1,143 @@
+"""Versioned report state that is updated batch by batch.
+
+The ReportStats of everything loaded so far is saved under a state
+directory, one sub-directory per version holding a Parquet file per metric
+and a manifest. Appending a batch of new bookings only computes the
+statistics of that batch and adds them to the saved ones, so a daily refresh
+costs as much as the new extract rather than the whole history.
+
+Bookings that were already loaded and changed afterwards (typically
+is_canceled flipping) are corrected by retracting their old rows and adding
+the new ones. The room price quantile sketches cannot retract values and
+are not part of the state (ReportStats(sketches=False)).
+
+    state_dir/
+        v000001/manifest.json, guests_per_country.parquet, ...
+        v000002/...
+"""
+
+import datetime
+import json
+import os
+
+import pandas as pd
+
+from .aggregates import GroupStats
+from .cleaning import add_derived, clean_bookings
+from .loader import apply_schema, file_digest
+from .report import ReportStats
+from .streaming import DEFAULT_CHUNKSIZE, stream_stats
+
+_VERSION_PREFIX = "v"
+
+
+def _version_dir(state_dir, version):
+    return os.path.join(state_dir, f"{_VERSION_PREFIX}{version:06d}")
+
+
+def list_versions(state_dir):
+    """Versions saved under state_dir, oldest first."""
+    if not os.path.isdir(state_dir):
+        return []
+    return sorted(int(name[len(_VERSION_PREFIX):]) for name in os.listdir(state_dir)
+                  if name.startswith(_VERSION_PREFIX) and name[len(_VERSION_PREFIX):].isdigit())
+
+
+def _metric_spec(metrics):
+    return [[metric.name, list(metric.by), metric.value, metric.stayed_only] for metric in metrics]
+
+
+def save_state(state_dir, stats, change, parent=None):
+    """Write stats as a new version and return its number.
+
+    change describes what the version adds on top of parent (a dict that
+    ends up in the manifest).
+    """
+    versions = list_versions(state_dir)
+    version = versions[-1] + 1 if versions else 1
+    target = _version_dir(state_dir, version)
+    tmp_target = target + ".tmp"
+    os.makedirs(tmp_target)
+    for name, stat in stats.stats.items():
+        if stat.table is not None:
+            stat.to_frame().to_parquet(os.path.join(tmp_target, f"{name}.parquet"), index=False)
+    manifest = {
+        "version": version,
+        "parent": parent,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "metrics": _metric_spec(stats.metrics),
+        "change": change,
+    }
+    with open(os.path.join(tmp_target, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    # A version only becomes visible once it is complete.
+    os.rename(tmp_target, target)
+    return version
+
+
+def load_state(state_dir, version=None):
+    """Load the ReportStats of a version (the latest by default) and its manifest."""
+    if version is None:
+        versions = list_versions(state_dir)
+        if not versions:
+            raise FileNotFoundError(f"No report state in {state_dir!r}")
+        version = versions[-1]
+    source = _version_dir(state_dir, version)
+    with open(os.path.join(source, "manifest.json")) as fh:
+        manifest = json.load(fh)
+
+    stats = ReportStats(sketches=False)
+    if manifest["metrics"] != _metric_spec(stats.metrics):
+        raise ValueError(f"Report state {source!r} was saved for other metrics; rebuild it with init_state()")
+    for name, stat in stats.stats.items():
+        path = os.path.join(source, f"{name}.parquet")
+        if os.path.exists(path):
+            stats.stats[name] = GroupStats.from_frame(stat.metric, pd.read_parquet(path))
+    return stats, manifest
+
+
+def _batch_stats(batch, chunksize):
+    # A batch is either a CSV path (streamed) or a raw frame of bookings.
+    if isinstance(batch, (str, os.PathLike)):
+        return stream_stats(batch, chunksize, sketches=False), {
+            "source": os.fspath(batch), "hash": file_digest(batch)}
+    data_cln = add_derived(clean_bookings(apply_schema(batch)))
+    return ReportStats(sketches=False).update(data_cln), {"source": "frame", "rows": len(batch)}
+
+
+def init_state(state_dir, batch, chunksize=DEFAULT_CHUNKSIZE):
+    """Start a state directory from a full extract and return the version."""
+    stats, change = _batch_stats(batch, chunksize)
+    return save_state(state_dir, stats, dict(change, kind="init"))
+
+
+def append_batch(state_dir, batch, chunksize=DEFAULT_CHUNKSIZE):
+    """Add a batch of new bookings to the latest state; returns the new version."""
+    stats, manifest = load_state(state_dir)
+    batch_stats, change = _batch_stats(batch, chunksize)
+    stats.merge(batch_stats)
+    return save_state(state_dir, stats, dict(change, kind="append"), parent=manifest["version"])
+
+
+def correct_bookings(state_dir, old_rows, new_rows):
+    """Replace bookings already in the state by their corrected rows.
+
+    old_rows are the bookings as they were loaded, new_rows the same
+    bookings as they are now, e.g. with is_canceled flipped. Both are raw
+    frames; rows dropped by the cleaning rules are ignored on either side.
+    """
+    stats, manifest = load_state(state_dir)
+    stats.retract(add_derived(clean_bookings(apply_schema(old_rows))))
+    stats.update(add_derived(clean_bookings(apply_schema(new_rows))))
+    change = {"kind": "correction", "retracted": len(old_rows), "added": len(new_rows)}
+    return save_state(state_dir, stats, change, parent=manifest["version"])
+
+
+def flip_cancellations(state_dir, rows):
+    """Correct bookings whose cancellation status flipped since they were loaded.
+
+    rows are the bookings as they were loaded; they are replaced by the same
+    rows with is_canceled inverted.
+    """
+    flipped = rows.assign(is_canceled=1 - rows["is_canceled"])
+    return correct_bookings(state_dir, rows, flipped)
@@ -0,0 +1,139 @@
+"""Nightly occupancy, guests and revenue per hotel from the stay intervals.
+
+Every non-cancelled booking occupies one room from its arrival date for
+stays_in_weekend_nights + stays_in_week_nights nights. Instead of
+expanding bookings into one row per night, each booking adds its
+quantities at the arrival night and takes them off again at the departure
+night of a difference array (two np.bincount calls per quantity); the
+cumulative sum of that array is the occupancy of every night. The cost is
+linear in the number of bookings plus the number of calendar nights,
+whatever the lengths of stay.
+
+NightlyOccupancy can be updated chunk by chunk (e.g. from
+hotel_eda.streaming.iter_clean_chunks) and merged like the other
+accumulators; the streamed, parallel and column store reports do not
+compute it, only nightly_occupancy of a frame in memory (the script and
+the query service) does. Bookings with zero nights (day use) occupy no
+night.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .loader import MONTHS
+from .report import HOTELS
+
+# Month name -> month number - 1.
+MONTH_INDEX = {name: i for i, name in enumerate(MONTHS)}
+
+# Quantities accumulated per hotel and night.
+QUANTITIES = ["rooms", "guests", "revenue"]
+
+
+def arrival_days(data, mask=None):
+    """Arrival dates as days since 1970-01-01 (int64), from the arrival_date_* columns."""
+    month = data["arrival_date_month"]
+    if isinstance(month.dtype, pd.CategoricalDtype):
+        # Look up the few categories, whatever their order, and index by the codes.
+        lookup = np.array([MONTH_INDEX.get(name, -1) for name in month.cat.categories] + [-1])
+        month_index = lookup[month.cat.codes.to_numpy()]
+    else:
+        month_index = month.map(MONTH_INDEX).fillna(-1).to_numpy().astype("int64")
+    if (month_index < 0).any():
+        unknown = sorted(set(month[month_index < 0].astype(str)))
+        raise ValueError(f"arrival_date_month: not a month name: {unknown}")
+    year = data["arrival_date_year"].to_numpy()
+    day = data["arrival_date_day_of_month"].to_numpy()
+    if mask is not None:
+        year, month_index, day = year[mask], month_index[mask], day[mask]
+    months = (year.astype("int64") - 1970) * 12 + month_index
+    if not len(months):
+        return months
+    # The first day of only the few distinct months, looked up per booking
+    first = months.min()
+    first_days = np.arange(first, months.max() + 1).astype("datetime64[M]").astype("datetime64[D]").astype("int64")
+    return first_days[months - first] + day - 1
+
+
+class NightlyOccupancy:
+    """Difference arrays of rooms, guests and ADR revenue per hotel and night."""
+
+    def __init__(self, hotels=HOTELS):
+        self.hotels = list(hotels)
+        self.origin = None
+        # quantity x hotel x (night - origin); one extra slot for the last departures
+        self.diffs = np.zeros((len(QUANTITIES), len(self.hotels), 0))
+
+    def _cover(self, first, end):
+        # Grow the arrays so that they cover the nights first..end (departure slot included).
+        if self.origin is None:
+            self.origin = first
+            self.diffs = np.zeros((len(QUANTITIES), len(self.hotels), end - first + 1))
+            return
+        before = max(self.origin - first, 0)
+        after = max(end - (self.origin + self.diffs.shape[2] - 1), 0)
+        if before or after:
+            self.diffs = np.pad(self.diffs, ((0, 0), (0, 0), (before, after)))
+            self.origin -= before
+
+    def update(self, data_cln):
+        """Add the stays of the non-cancelled bookings of a cleaned frame (or chunk)."""
+        hotel = pd.Categorical(data_cln["hotel"], categories=self.hotels).codes
+        # Work in the narrow schema dtypes until the rows are selected.
+        nights = data_cln["stays_in_weekend_nights"].to_numpy() + data_cln["stays_in_week_nights"].to_numpy()
+        mask = (data_cln["is_canceled"].to_numpy() == 0) & (hotel >= 0) & (nights > 0)
+        if not mask.any():
+            return self
+
+        start = arrival_days(data_cln, mask)
+        end = start + nights[mask]
+        self._cover(int(start.min()), int(end.max()))
+        width = self.diffs.shape[2]
+        offset = hotel[mask].astype("int64") * width - self.origin
+        start_slot, end_slot = offset + start, offset + end
+
+        def selected(name):
+            return data_cln[name].to_numpy()[mask].astype("float64")
+
+        guests = selected("adults") + np.nan_to_num(selected("children")) + selected("babies")
+        weights = [None, guests, selected("adr")]
+        size = len(self.hotels) * width
+        for i, weight in enumerate(weights):
+            diff = (np.bincount(start_slot, weight, minlength=size)
+                    - np.bincount(end_slot, weight, minlength=size))
+            self.diffs[i] += diff.reshape(len(self.hotels), width)
+        return self
+
+    def merge(self, other):
+        """Add the stays of another NightlyOccupancy (e.g. of another chunk)."""
+        if other.origin is None:
+            return self
+        width = other.diffs.shape[2]
+        self._cover(other.origin, other.origin + width - 1)
+        start = other.origin - self.origin
+        self.diffs[:, :, start:start + width] += other.diffs
+        return self
+
+    def nightly(self):
+        """Rooms, guests, revenue and ADR per hotel and night, as a long frame."""
+        if self.origin is None:
+            return pd.DataFrame(columns=["hotel", "night"] + QUANTITIES + ["adr"])
+        # The last slot only holds departures, so it is always empty.
+        totals = np.cumsum(self.diffs, axis=2)[:, :, :-1]
+        nights = np.arange(self.origin, self.origin + totals.shape[2]).astype("datetime64[D]")
+        frame = pd.DataFrame({
+            "hotel": pd.Categorical(np.repeat(self.hotels, len(nights)), categories=self.hotels),
+            "night": np.tile(nights, len(self.hotels)),
+        })
+        for i, name in enumerate(QUANTITIES):
+            frame[name] = totals[i].ravel()
+        # Room and guest counts were summed as float64, which is exact for them.
+        frame["rooms"] = frame["rooms"].round().astype("int64")
+        frame["guests"] = frame["guests"].round().astype("int64")
+        frame["adr"] = frame["revenue"] / frame["rooms"].where(frame["rooms"] > 0)
+        return frame
+
+
+def nightly_occupancy(data_cln, hotels=HOTELS):
+    """Nightly rooms, guests, revenue and ADR per hotel of a cleaned frame."""
+    return NightlyOccupancy(hotels).update(data_cln).nightly()
@@ -0,0 +1,137 @@
+"""Partitioned execution of the report over a process pool.
+
+The bookings are split into partitions that are cleaned, extended with the
+derived columns and aggregated independently; the partial ReportStats are
+merged into one, which build_report turns into the usual tables. With
+intervals, every partition also counts the rows behind the bootstrap
+intervals, with a seed of its own (see hotel_eda.bootstrap).
+
+Two ways of partitioning are offered:
+
+* parallel_stats splits the CSV into byte ranges aligned on line breaks.
+  Every worker parses its own ranges, so the parsing - the expensive part -
+  runs in parallel and nothing but the small partial statistics travels
+  between processes.
+* parallel_stats_frame splits a frame already in memory by hotel and
+  arrival year.
+
+Run as ``python -m hotel_eda.parallel hotel_bookings.csv`` to print how the
+run time scales with the number of workers.
+"""
+
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .bootstrap import BootstrapStats, block_seed
+from .cleaning import add_derived, clean_bookings
+from .loader import SCHEMA, apply_schema
+from .report import ReportStats, build_report
+
+PARTITION_KEYS = ["hotel", "arrival_date_year"]
+
+# Target size of one byte range; several ranges per worker keep the load
+# balanced and bound the memory a worker needs at once.
+DEFAULT_PARTITION_BYTES = 32 << 20
+
+
+def csv_partitions(file_path, partition_bytes=DEFAULT_PARTITION_BYTES):
+    """Split the CSV body into (start, end) byte ranges that end on a line break.
+
+    The hotel bookings contain no quoted line breaks, so every line is a row.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as fh:
+        fh.readline()  # header
+        start = fh.tell()
+        ranges = []
+        while start < size:
+            fh.seek(min(start + partition_bytes, size))
+            fh.readline()
+            end = min(fh.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _csv_columns(file_path):
+    with open(file_path, "rb") as fh:
+        return fh.readline().decode().rstrip("\r\n").split(",")
+
+
+def _partition_stats(sketches, bootstrap_seed):
+    # An empty ReportStats of one partition; a bootstrap_seed of None leaves out the bootstrap counts.
+    bootstrap = None if bootstrap_seed is None else BootstrapStats(seed=bootstrap_seed)
+    return ReportStats(sketches=sketches, bootstrap=bootstrap)
+
+
+def _stats_of_range(file_path, columns, start, end, sketches=True, bootstrap_seed=None):
+    with open(file_path, "rb") as fh:
+        fh.seek(start)
+        body = fh.read(end - start)
+    data = pd.read_csv(io.BytesIO(body), names=columns, header=None, dtype=SCHEMA)
+    return _partition_stats(sketches, bootstrap_seed).update(add_derived(clean_bookings(data)))
+
+
+def _stats_of_frame(data):
+    return ReportStats().update(add_derived(clean_bookings(apply_schema(data))))
+
+
+def _bootstrap_seeds(n_partitions, intervals):
+    return [block_seed(0, index) if intervals else None for index in range(n_partitions)]
+
+
+def _merge_all(partials, sketches=True, intervals=False):
+    stats = _partition_stats(sketches, block_seed(0, 0) if intervals else None)
+    for partial in partials:
+        stats.merge(partial)
+    return stats
+
+
+def parallel_stats(file_path, workers=None, partition_bytes=DEFAULT_PARTITION_BYTES, sketches=True,
+                   intervals=False):
+    """ReportStats of the CSV, parsed and aggregated by a pool of workers."""
+    columns = _csv_columns(file_path)
+    ranges = csv_partitions(file_path, partition_bytes)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = pool.map(_stats_of_range,
+                            [file_path] * len(ranges), [columns] * len(ranges),
+                            [start for start, _ in ranges], [end for _, end in ranges],
+                            [sketches] * len(ranges), _bootstrap_seeds(len(ranges), intervals))
+        return _merge_all(partials, sketches, intervals)
+
+
+def parallel_stats_frame(data, workers=None, by=PARTITION_KEYS):
+    """ReportStats of a raw frame, split by hotel and arrival year across workers."""
+    partitions = (part for _, part in data.groupby(by, observed=True, sort=False))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return _merge_all(pool.map(_stats_of_frame, partitions))
+
+
+def parallel_report(file_path, workers=None, sketches=True, intervals=False):
+    """The report tables of the CSV, computed by a pool of workers."""
+    return build_report(parallel_stats(file_path, workers, sketches=sketches, intervals=intervals))
+
+
+def scaling_benchmark(file_path, worker_counts=None, partition_bytes=DEFAULT_PARTITION_BYTES):
+    """Time parallel_stats for several worker counts; speedup is relative to one worker."""
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, 8, 16, 32, cpus} & set(range(1, cpus + 1)))
+    rows = []
+    for workers in worker_counts:
+        started = time.perf_counter()
+        parallel_stats(file_path, workers, partition_bytes)
+        rows.append({"workers": workers, "seconds": time.perf_counter() - started})
+    result = pd.DataFrame(rows)
+    result["speedup"] = result["seconds"].iloc[0] / result["seconds"]
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(scaling_benchmark(sys.argv[1] if len(sys.argv) > 1 else "hotel_bookings.csv").to_string(index=False))
@@ -0,0 +1,259 @@
+"""The report's figures, drawn from precomputed statistics instead of raw rows.
+
+Every function takes one of the small tables the report builds (counts,
+means, standard deviations, box statistics) and draws the same figure the
+script used to get from seaborn over the full frame, so drawing time no
+longer depends on the number of bookings. Each returns its Figure and draws
+on ``ax`` if one is given.
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+from matplotlib.patches import Patch
+
+from .loader import MONTHS
+
+_BXP_KEYS = ["med", "q1", "q3", "whislo", "whishi", "fliers"]
+
+HOTEL_COLORS = {"City Hotel": "blue", "Resort Hotel": "red"}
+
+
+def _axes(ax, figsize):
+    if ax is None:
+        fig, ax = plt.subplots(figsize=figsize)
+    return ax.figure, ax
+
+
+def boxplot_from_summary(boxes, x, hue, ax=None, palette="Set2", linewidth=2.5, width=0.8):
+    """Grouped box plot from one row of box statistics per (x, hue) cell.
+
+    boxes is a frame like GroupSketches.summary() returns. The layout follows
+    seaborn.boxplot(x=..., hue=...): boxes of one x level sit side by side,
+    coloured by hue level, and every hue level gets a legend label.
+    """
+    if ax is None:
+        ax = plt.gca()
+    x_levels = sorted(boxes[x].unique())
+    hue_levels = sorted(boxes[hue].unique())
+    colors = sns.color_palette(palette, len(hue_levels))
+    box_width = width / len(hue_levels)
+
+    for position, (level, color) in enumerate(zip(hue_levels, colors)):
+        part = boxes.loc[boxes[hue] == level]
+        offset = (position - (len(hue_levels) - 1) / 2) * box_width
+        artists = ax.bxp(
+            part[_BXP_KEYS].to_dict("records"),
+            positions=[x_levels.index(value) + offset for value in part[x]],
+            widths=box_width * 0.9,
+            patch_artist=True,
+            manage_ticks=False,
+            boxprops=dict(facecolor=color, edgecolor=".3", linewidth=linewidth),
+            whiskerprops=dict(color=".3", linewidth=linewidth),
+            capprops=dict(color=".3", linewidth=linewidth),
+            medianprops=dict(color=".3", linewidth=linewidth),
+            flierprops=dict(marker="o", markerfacecolor="none", markeredgecolor=".3", markersize=5),
+        )
+        if artists["boxes"]:
+            artists["boxes"][0].set_label(level)
+
+    ax.set_xticks(range(len(x_levels)), x_levels)
+    ax.set_xlim(-0.5, len(x_levels) - 0.5)
+    ax.set_xlabel(x)
+    ax.legend(handles=[Patch(facecolor=color, edgecolor=".3", label=level)
+                       for level, color in zip(hue_levels, colors)], title=hue)
+    return ax
+
+
+def grouped_bars(table, x, hue, y, err=None, ax=None, palette=None, width=0.8, capsize=0.1, err_width=1):
+    """Grouped bar chart from one row per (x, hue) cell, as seaborn.barplot lays it out.
+
+    err names a column with the half height of the error bars (e.g. the
+    standard deviation); capsize is relative to the width of a bar.
+    """
+    if ax is None:
+        ax = plt.gca()
+    x_levels = list(dict.fromkeys(table[x]))
+    hue_levels = sorted(table[hue].unique())
+    colors = sns.color_palette(palette, len(hue_levels))
+    bar_width = width / len(hue_levels)
+    ax.set_xticks(range(len(x_levels)), x_levels)
+    ax.set_xlim(-0.5, len(x_levels) - 0.5)
+    # matplotlib takes the cap half length in points.
+    cap_points = (ax.transData.transform((capsize * bar_width, 0))[0]
+                  - ax.transData.transform((0, 0))[0]) * 72 / ax.figure.dpi / 2
+
+    for position, (level, color) in enumerate(zip(hue_levels, colors)):
+        part = table.loc[table[hue] == level]
+        offset = (position - (len(hue_levels) - 1) / 2) * bar_width
+        centers = np.array([x_levels.index(value) for value in part[x]]) + offset
+        ax.bar(centers, part[y], bar_width, color=color, label=level)
+        if err is not None:
+            errors = part[err].to_numpy()
+            shown = ~np.isnan(errors)
+            ax.errorbar(centers[shown], part[y].to_numpy()[shown], yerr=errors[shown], fmt="none",
+                        ecolor=".26", elinewidth=err_width, capthick=err_width, capsize=cap_points)
+    return ax
+
+
+def hue_lines(table, x, y, hue, order, ax=None, palette=None, linewidth=2.5, band=None):
+    """One line with markers per hue level, x following ``order``.
+
+    band names the (lower, upper) columns of a shaded interval around each line.
+    """
+    if ax is None:
+        ax = plt.gca()
+    hue_levels = sorted(table[hue].unique())
+    if palette is None:
+        palette = dict(zip(hue_levels, sns.color_palette(n_colors=len(hue_levels))))
+    for level in hue_levels:
+        part = table.loc[table[hue] == level].set_index(x).reindex(order)
+        ax.plot(range(len(order)), part[y].to_numpy(), marker="o", linewidth=linewidth,
+                color=palette[level], label=level)
+        if band is not None:
+            lower, upper = band
+            ax.fill_between(range(len(order)), part[lower].to_numpy(dtype="float64"),
+                            part[upper].to_numpy(dtype="float64"), color=palette[level], alpha=0.2,
+                            linewidth=0)
+    ax.set_xticks(range(len(order)), order)
+    return ax
+
+
+def country_bar(country_data, top=22, ax=None):
+    """Home Country of Guests: the ``top`` countries by number of guests."""
+    fig, ax = _axes(ax, (10, 6))
+    top_countries = country_data.sort_values(by="Number of Guests", ascending=False).head(top)
+    ax.bar(top_countries["country"], top_countries["Number of Guests"], color="c")
+    ax.set_title("Home Country of Guests")
+    ax.set_xlabel("Country")
+    ax.set_ylabel("Number of Guests")
+    ax.tick_params(axis="x", labelrotation=45)
+    return fig
+
+
+def room_price_boxplot(room_price_boxes, ax=None):
+    """Price of Room Types per Night and Person, per hotel."""
+    fig, ax = _axes(ax, (10, 6))
+    boxplot_from_summary(room_price_boxes, x="reserved_room_type", hue="hotel", ax=ax,
+                         palette="Set2", linewidth=2.5)
+    ax.set_title("Price of Room Types per Night and Person", fontsize=16)
+    ax.set_xlabel("Room Type", fontsize=14)
+    ax.set_ylabel("Price [EUR]", fontsize=14)
+    ax.set_ylim(0, 160)
+    ax.legend(handles=ax.get_legend().legend_handles, title="Hotel", loc="upper right",
+              title_fontsize="13", fontsize="12")
+    return fig
+
+
+def monthly_price_line(grouped, ax=None, intervals=None):
+    """Room Price Per Night and Person Over the Year, from the monthly means.
+
+    intervals (see hotel_eda.bootstrap) adds a band of the confidence
+    interval of every monthly mean.
+    """
+    fig, ax = _axes(ax, (12, 8))
+    band = None
+    if intervals is not None:
+        grouped = grouped.merge(intervals[["arrival_date_month", "hotel", "lower", "upper"]],
+                                on=["arrival_date_month", "hotel"], how="left")
+        band = ("lower", "upper")
+    hue_lines(grouped, x="arrival_date_month", y="adr_pp", hue="hotel", order=MONTHS, ax=ax, band=band)
+    ax.set_title("Room Price Per Night and Person Over the Year", fontsize=16)
+    ax.set_xlabel("Month", fontsize=14)
+    ax.set_ylabel("Price [EUR]", fontsize=14)
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.legend(title="Hotel", title_fontsize="13", fontsize="12")
+    return fig
+
+
+def guests_per_month_line(guest_counts, ax=None):
+    """Average Number of Hotel Guests per Month, from the normalized counts."""
+    fig, ax = _axes(ax, (12, 8))
+    hue_lines(guest_counts, x="arrival_date_month", y="guests", hue="hotel", order=MONTHS, ax=ax,
+              palette=HOTEL_COLORS)
+    ax.set_title("Average Number of Hotel Guests per Month", fontsize=16)
+    ax.set_xlabel("Month", fontsize=14)
+    ax.set_ylabel("Number of Guests", fontsize=14)
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.legend(title="Hotel", title_fontsize="13", fontsize="12")
+    return fig
+
+
+def stay_length_stackplot(nights_data, ax=None):
+    """Length of Stay by Hotel Type, as a stacked area of booking shares."""
+    fig, ax = _axes(ax, (12, 8))
+    ax.stackplot(nights_data.index, nights_data["City hotel"], nights_data["Resort hotel"],
+                 labels=["City Hotel", "Resort Hotel"], colors=["skyblue", "salmon"])
+    ax.set_xlabel("Number of Nights")
+    ax.set_ylabel("Guests [%]")
+    ax.set_title("Length of Stay by Hotel Type - Stacked Area Chart")
+    ax.legend(loc="upper right")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(True)
+    ax.set_xlim(-0.5, 16)
+    return fig
+
+
+def segment_pie(segments, ax=None):
+    """Bookings per market segment."""
+    fig, ax = _axes(ax, None)
+    ax.pie(segments, labels=segments.index, autopct="%1.1f%%", startangle=90,
+           colors=plt.cm.Paired(np.arange(len(segments))))
+    ax.axis("equal")  # Equal aspect ratio ensures that pie is drawn as a circle.
+    ax.set_title("Bookings per market segment")
+    return fig
+
+
+def adr_segment_room_bars(adr_segment_room, ax=None):
+    """ADR by market segment and room type: mean bars with +/- one sd."""
+    fig, ax = _axes(ax, (12, 8))
+    grouped_bars(adr_segment_room, x="market_segment", hue="reserved_room_type", y="mean", err="sd",
+                 ax=ax, capsize=0.1, err_width=1)
+    ax.set_title("ADR by market segment and room type", fontsize=16)
+    ax.set_xlabel("Market segment", fontsize=16)
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_ylabel("ADR per person [EUR]", fontsize=16)
+    ax.legend(loc="upper left")
+    return fig
+
+
+def cancellations_per_month_bars(hotel_data, ax=None, intervals=None):
+    """Cancellations per Month: cancellation rate per month and hotel, labelled.
+
+    intervals (see hotel_eda.bootstrap) adds error bars spanning the
+    confidence interval of every rate.
+    """
+    fig, ax = _axes(ax, (14, 8))
+    pivot_table = hotel_data.pivot(index="arrival_date_month", columns="hotel", values="cancel_percent")
+    months = [month for month in MONTHS if month in pivot_table.index]
+    pivot_table = pivot_table.reindex(months)
+
+    ind = np.arange(len(pivot_table))  # the x locations for the groups
+    width = 0.35  # the width of the bars
+    rects1 = ax.bar(ind - width / 2, pivot_table["City Hotel"], width, label="City Hotel", color="b")
+    rects2 = ax.bar(ind + width / 2, pivot_table["Resort Hotel"], width, label="Resort Hotel", color="r")
+    if intervals is not None:
+        for hotel, offset in [("City Hotel", -width / 2), ("Resort Hotel", width / 2)]:
+            part = intervals.loc[intervals["hotel"] == hotel].set_index("arrival_date_month").reindex(months)
+            rate = pivot_table[hotel].to_numpy()
+            errors = np.vstack([rate - part["lower"].to_numpy(dtype="float64"),
+                                part["upper"].to_numpy(dtype="float64") - rate])
+            ax.errorbar(ind + offset, rate, yerr=errors, fmt="none", ecolor=".26", elinewidth=1, capsize=3)
+
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Cancellation Rate [%]")
+    ax.set_title("Cancellations per Month")
+    ax.set_xticks(ind)
+    ax.set_xticklabels(pivot_table.index, rotation=45)
+    ax.legend()
+
+    # Add percentage values above bars for clarity
+    for bar in list(rects1) + list(rects2):
+        height = bar.get_height()
+        ax.annotate(f"{height:.1f}%",
+                    xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 3),
+                    textcoords="offset points",
+                    ha="center", va="bottom")
+    fig.tight_layout()
+    return fig
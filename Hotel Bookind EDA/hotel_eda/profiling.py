@@ -0,0 +1,207 @@
+"""Per-stage timing and memory instrumentation.
+
+Wrap a stage in ``with stage("name") as st:`` and, optionally, hand the
+frame it produced to ``st.frame(data)``. For every stage the active
+Profiler records wall time, CPU time, the process' peak RSS (and how much
+the stage raised it), the bytes of the frames it produced and, with
+allocation tracing on, the peak memory allocated inside it. Stages nest.
+
+Nothing is recorded until a profiler is enabled, and stage() is then a
+single ``is None`` check. It is enabled by ``enable(path)`` or by setting
+HOTEL_EDA_PROFILE to the output path before hotel_eda is used, which is
+how nightly jobs leave it on; the trace is written when the process
+exits. The output is a Chrome trace (``{"traceEvents": [...]}``), which
+opens in Perfetto, chrome://tracing or speedscope as a flame chart, with
+the measurements as the events' args and an RSS counter track.
+
+A stage costs about 30 microseconds (timers, getrusage, /proc). Allocation
+tracing (HOTEL_EDA_PROFILE_ALLOC=1) uses tracemalloc, which slows down
+Python-heavy code and is meant for one-off investigations.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_ENV = "HOTEL_EDA_PROFILE"
+ALLOC_ENV = "HOTEL_EDA_PROFILE_ALLOC"
+
+# ru_maxrss is in KiB on Linux and in bytes on macOS.
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss():
+    """Peak resident set size of this process so far, in bytes (0 if unknown)."""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def current_rss():
+    """Current resident set size in bytes, where /proc tells (0 otherwise)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def frame_bytes(obj):
+    """Bytes held by a DataFrame's or Series' columns (object values not followed)."""
+    usage = obj.memory_usage(deep=False)
+    return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+
+class Stage:
+    """One timed stage; frame() adds the size of the frames it produced."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.frame_bytes = 0
+        self.alloc_peak = 0
+
+    def frame(self, *frames):
+        for obj in frames:
+            self.frame_bytes += frame_bytes(obj)
+        return frames[0] if len(frames) == 1 else frames
+
+
+class _NullStage:
+    def frame(self, *frames):
+        return frames[0] if len(frames) == 1 else frames
+
+
+_NULL_STAGE = nullcontext(_NullStage())
+
+
+class Profiler:
+    """Records the stages run while it is active and writes them as a trace."""
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.records = []
+        self._origin = time.perf_counter()
+        self._stack = threading.local()
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, **args):
+        stack = self._stack.__dict__.setdefault("entries", [])
+        entry = Stage(name, args)
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].alloc_peak = max(stack[-1].alloc_peak, peak)
+            tracemalloc.reset_peak()
+            start_alloc = entry.alloc_peak = current
+        stack.append(entry)
+        rss_before = peak_rss()
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            rss_after = peak_rss()
+            stack.pop()
+            record = {
+                "stage": name,
+                "depth": len(stack),
+                "start": start - self._origin,
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "peak_rss": rss_after,
+                "rss_growth": rss_after - rss_before,
+                "rss": current_rss(),
+                "frame_bytes": entry.frame_bytes,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            }
+            if self.trace_allocations:
+                peak = max(entry.alloc_peak, tracemalloc.get_traced_memory()[1])
+                record["alloc_peak"] = peak - start_alloc
+                if stack:
+                    stack[-1].alloc_peak = max(stack[-1].alloc_peak, peak)
+            record.update(args)
+            self.records.append(record)
+
+    def run(self, name, func, *args, **kwargs):
+        """Call func inside a stage, counting its result's bytes if it is a frame."""
+        with self.stage(name) as st:
+            result = func(*args, **kwargs)
+            if hasattr(result, "memory_usage"):
+                st.frame(result)
+        return result
+
+    def trace_events(self):
+        events = []
+        for record in self.records:
+            args = {key: value for key, value in record.items()
+                    if key not in ("stage", "start", "wall_s", "pid", "tid", "depth")}
+            start_us = record["start"] * 1e6
+            end_us = start_us + record["wall_s"] * 1e6
+            events.append({"name": record["stage"], "cat": "stage", "ph": "X", "ts": start_us,
+                           "dur": record["wall_s"] * 1e6, "pid": record["pid"], "tid": record["tid"],
+                           "args": args})
+            if record["rss"]:
+                events.append({"name": "rss", "ph": "C", "ts": end_us, "pid": record["pid"],
+                               "args": {"MiB": record["rss"] / (1 << 20)}})
+        return events
+
+    def write(self, path):
+        """Write the stages as a Chrome trace to path."""
+        with open(path, "w") as fh:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, fh)
+        return path
+
+    def summary(self):
+        """The recorded stages as a frame, in the order they finished."""
+        import pandas as pd
+        return pd.DataFrame(self.records)
+
+
+_active = None
+
+
+def enable(path=None, trace_allocations=False):
+    """Start recording stages; the trace is written to path at exit if given."""
+    global _active
+    _active = Profiler(trace_allocations=trace_allocations)
+    if path:
+        atexit.register(_active.write, path)
+    return _active
+
+
+def disable():
+    """Stop recording and return the profiler that was active."""
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def active():
+    return _active
+
+
+def stage(name, **args):
+    """Context manager timing a stage under the active profiler, if any."""
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name, **args)
+
+
+if os.environ.get(PROFILE_ENV):
+    enable(os.environ[PROFILE_ENV], trace_allocations=os.environ.get(ALLOC_ENV, "") not in ("", "0"))
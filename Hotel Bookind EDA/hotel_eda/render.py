@@ -0,0 +1,149 @@
+"""Headless batch rendering of all report figures to files.
+
+render_report draws the eight figures of the report with the non-interactive
+Agg backend, one process per figure, and writes each as PNG and/or SVG.
+The monthly price line and the monthly cancellation bars also draw the
+bootstrap confidence intervals (see hotel_eda.bootstrap) when they are
+given. Every figure is keyed on a hash of the table (and intervals) it is
+drawn from; when they did not change since the last run and the files are
+still there, the figure is skipped.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+# Figure name -> (plotting function in hotel_eda.plotting, report table it draws).
+FIGURES = {
+    "country_bar": ("country_bar", "country_data"),
+    "room_price_boxplot": ("room_price_boxplot", "room_price_boxes"),
+    "monthly_price_line": ("monthly_price_line", "grouped"),
+    "guests_per_month_line": ("guests_per_month_line", "guest_counts"),
+    "stay_length_stackplot": ("stay_length_stackplot", "nights_data"),
+    "segment_pie": ("segment_pie", "segments"),
+    "adr_segment_room_bars": ("adr_segment_room_bars", "adr_segment_room"),
+    "cancellations_per_month_bars": ("cancellations_per_month_bars", "hotel_data"),
+}
+
+# Figure name -> bootstrap_intervals table it draws as bands or error bars.
+FIGURE_INTERVALS = {
+    "monthly_price_line": "adr_pp_per_month",
+    "cancellations_per_month_bars": "cancellations_per_month",
+}
+
+DEFAULT_FORMATS = ("png", "svg")
+
+# Bump when the figures change in a way their input hash cannot see.
+RENDER_VERSION = 1
+
+_CACHE_FILE = ".render-cache.json"
+
+
+def _hash_table(digest, table):
+    # Hash the values, index, column names and dtypes of a frame or series;
+    # unlike a pickle this does not change with the pandas version.
+    if table is None:
+        digest.update(b"None")
+        return
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    digest.update(repr([(str(name), repr(dtype)) for name, dtype in frame.dtypes.items()]).encode())
+    # Array cells (the fliers of the room price boxes) are hashed by their bytes.
+    frame = frame.apply(lambda column: column.map(lambda value: np.asarray(value).tobytes())
+                        if column.map(lambda value: isinstance(value, (list, np.ndarray))).any() else column)
+    digest.update(repr(list(frame.index.names)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+
+
+def _figure_key(name, table, intervals, formats, dpi):
+    import matplotlib
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((RENDER_VERSION, matplotlib.__version__, name, sorted(formats), dpi)).encode())
+    _hash_table(digest, table)
+    _hash_table(digest, intervals)
+    return digest.hexdigest()
+
+
+def _render_one(name, table, intervals, out_dir, formats, dpi):
+    # Runs in a worker process: pick the headless backend before pyplot loads.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    from . import plotting
+
+    sns.set_theme(style="whitegrid")
+    options = {} if intervals is None else {"intervals": intervals}
+    fig = getattr(plotting, FIGURES[name][0])(table, **options)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        fig.savefig(path, dpi=dpi, bbox_inches="tight")
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+def _read_cache(out_dir):
+    try:
+        with open(os.path.join(out_dir, _CACHE_FILE)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_report(report, out_dir, formats=DEFAULT_FORMATS, workers=None, dpi=100, cache=True, figures=None,
+                  intervals=None):
+    """Render the report's figures into out_dir and return {name: "rendered" | "cached"}.
+
+    figures limits the run to some of the names in FIGURES; figures whose
+    table is missing from the report (e.g. no room price sketches) are left out.
+    intervals is the result of bootstrap_intervals, drawn by the figures of
+    FIGURE_INTERVALS.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    names = [name for name in (figures or FIGURES) if FIGURES[name][1] in report]
+    previous = _read_cache(out_dir) if cache else {}
+    figure_intervals = {name: (intervals or {}).get(FIGURE_INTERVALS.get(name)) for name in names}
+
+    keys, status, todo = {}, {}, []
+    for name in names:
+        keys[name] = _figure_key(name, report[FIGURES[name][1]], figure_intervals[name], formats, dpi)
+        files_exist = all(os.path.exists(os.path.join(out_dir, f"{name}.{fmt}")) for fmt in formats)
+        if previous.get(name) == keys[name] and files_exist:
+            status[name] = "cached"
+        else:
+            todo.append(name)
+
+    # Keys are saved only for the figures now on disk, and saved even when a
+    # figure fails, so the next run renders just the ones that did not finish.
+    try:
+        if todo:
+            with stage("render_figures", figures=len(todo)), ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_render_one, name, report[FIGURES[name][1]], figure_intervals[name],
+                                       out_dir, formats, dpi): name
+                           for name in todo}
+                error = None
+                for future in as_completed(futures):
+                    if future.exception() is None:
+                        status[futures[future]] = "rendered"
+                    elif error is None:
+                        error = future.exception()
+                if error is not None:
+                    raise error
+    finally:
+        for name in names:
+            if name in status:
+                previous[name] = keys[name]
+            else:
+                previous.pop(name, None)
+        with open(os.path.join(out_dir, _CACHE_FILE), "w") as fh:
+            json.dump(previous, fh, indent=2)
+    return status
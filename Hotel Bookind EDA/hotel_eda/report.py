@@ -0,0 +1,193 @@
+"""The tables and numbers of the Hotel Booking report, built from GroupStats.
+
+ReportStats holds one accumulator per metric of REPORT_METRICS and fills
+them all in a single pass per frame. It can be fed a whole cleaned frame or
+one chunk at a time; build_report turns the merged statistics into the same
+tables the script computes with pandas. Given a BootstrapStats, ReportStats
+also counts the rows behind the bootstrap intervals of the monthly figures
+in the same pass, and build_report adds the intervals under "intervals".
+"""
+
+import pandas as pd
+
+from .aggregates import GroupStats, Metric, compute_metrics
+from .bootstrap import BootstrapStats, block_seed, stats_intervals
+from .loader import MONTHS
+from .profiling import stage
+from .sketch import ROOM_PRICE_METRIC, GroupSketches
+
+HOTELS = ["Resort Hotel", "City Hotel"]
+
+# Metrics behind the report, "stayed" meaning non-cancelled bookings only.
+REPORT_METRICS = [
+    Metric("guests_per_country", ["country"], stayed_only=True),
+    Metric("adr_pp_per_hotel", ["hotel"], "adr_pp", stayed_only=True),
+    Metric("adr_pp_per_month", ["arrival_date_month", "hotel"], "adr_pp", stayed_only=True),
+    Metric("nights_per_hotel", ["hotel", "total_nights"], stayed_only=True),
+    Metric("bookings_per_segment", ["market_segment"]),
+    Metric("adr_pp_per_segment_room", ["market_segment", "reserved_room_type"], "adr_pp"),
+    Metric("cancellations_per_month", ["hotel", "arrival_date_month"], "is_canceled"),
+    # Which months of which years the bookings cover, to normalize per month
+    Metric("bookings_per_year_month", ["arrival_date_year", "arrival_date_month"]),
+]
+
+
+class ReportStats:
+    """All accumulators of the report; update with cleaned chunks, merge partials."""
+
+    def __init__(self, metrics=REPORT_METRICS, sketches=True, bootstrap=None):
+        self.metrics = list(metrics)
+        self.stats = {metric.name: GroupStats(metric) for metric in self.metrics}
+        # Quantile sketches behind the room price box plot; the printed
+        # numbers do not need them.
+        self.room_prices = GroupSketches(ROOM_PRICE_METRIC) if sketches else None
+        # BootstrapStats behind the confidence intervals, if they are wanted.
+        self.bootstrap = bootstrap
+
+    def __getitem__(self, name):
+        return self.stats[name]
+
+    def update(self, data_cln):
+        """Fold a cleaned frame (or chunk) into every accumulator in one pass."""
+        with stage("metrics", rows=len(data_cln)):
+            for name, table in compute_metrics(data_cln, self.metrics).items():
+                self.stats[name].absorb(table)
+        if self.room_prices is not None:
+            with stage("room_price_sketches"):
+                self.room_prices.update(data_cln)
+        if self.bootstrap is not None:
+            self.bootstrap.update(data_cln)
+        return self
+
+    def retract(self, data_cln):
+        """Take rows that were folded in before back out of every GroupStats.
+
+        Quantile sketches cannot forget values, so room_prices is left as is.
+        """
+        for name, table in compute_metrics(data_cln, self.metrics).items():
+            self.stats[name].retract(table)
+        return self
+
+    def merge(self, other):
+        for name, stat in self.stats.items():
+            stat.merge(other.stats[name])
+        if self.room_prices is not None and other.room_prices is not None:
+            self.room_prices.merge(other.room_prices)
+        if self.bootstrap is not None and other.bootstrap is not None:
+            self.bootstrap.merge(other.bootstrap)
+        return self
+
+
+def _month_categorical(values):
+    return pd.Categorical(values, categories=MONTHS, ordered=True)
+
+
+def build_report(stats):
+    """Turn merged ReportStats into the report's tables and summary numbers."""
+    report = {}
+
+    # Number of guests per country
+    guests = stats["guests_per_country"].table["n"].astype("int64")
+    country_data = guests.sort_values(ascending=False, kind="stable").to_frame("Number of Guests")
+    country_data.index.name = "country"
+    total_guests = country_data["Number of Guests"].sum()
+    country_data["Guests in %"] = round(country_data["Number of Guests"] / total_guests * 100, 2)
+    country_data["country"] = country_data.index
+    report["country_data"] = country_data
+
+    # Average price per night and person of each hotel
+    report["adr_pp_mean"] = stats["adr_pp_per_hotel"].mean().to_dict()
+
+    # Box plot statistics of the room prices per room type and hotel
+    if stats.room_prices is not None and stats.room_prices.boxes:
+        report["room_price_boxes"] = stats.room_prices.summary()
+
+    # Monthly price per night and person, and guests per month
+    monthly = stats["adr_pp_per_month"]
+    grouped = monthly.table.reset_index()
+    grouped["arrival_date_month"] = _month_categorical(grouped["arrival_date_month"])
+    grouped["adr_pp"] = monthly.mean().to_numpy()
+    report["grouped"] = (grouped.sort_values(["arrival_date_month", "hotel"])
+                         [["arrival_date_month", "hotel", "adr_pp"]].reset_index(drop=True))
+
+    guest_counts = grouped[["hotel", "arrival_date_month"]].copy()
+    # Normalize every month by the number of years it occurs in the bookings
+    # (July and August in 3 years, the other months in 2 for the sample)
+    year_months = stats["bookings_per_year_month"].table
+    years = year_months.loc[year_months["n"] > 0].index.get_level_values("arrival_date_month").value_counts()
+    guest_counts["guests"] = grouped["n"].to_numpy() / years.reindex(grouped["arrival_date_month"].astype(str)).to_numpy()
+    report["guest_counts"] = guest_counts.sort_values(["hotel", "arrival_date_month"]).reset_index(drop=True)
+
+    # Length of stay
+    nights = stats["nights_per_hotel"].table["n"].unstack("hotel")
+    nights.index = nights.index.astype("int64")
+    nights = nights.sort_index()
+    shares = nights / nights.sum() * 100
+    # A slice may hold only one of the hotels; its column is then all zero.
+    nights_data = (shares.reindex(columns=HOTELS, fill_value=0.0).fillna(0)
+                   .rename(columns={"Resort Hotel": "Resort hotel", "City Hotel": "City hotel"})
+                   .sort_index())
+    nights_data.columns.name = None
+    nights_data.index = nights_data.index.astype(str)
+    report["nights_data"] = nights_data
+    counts = nights.fillna(0)
+    report["avg_nights"] = (counts.mul(counts.index, axis=0).sum() / counts.sum()).to_dict()
+    report["max_nights"] = {hotel: int(counts.index[counts[hotel] > 0].max()) for hotel in counts.columns}
+
+    # Bookings per market segment
+    segments = stats["bookings_per_segment"].table["n"].astype("int64")
+    segments = segments.sort_values(ascending=False, kind="stable").rename("count")
+    segments.index.name = "market_segment"
+    report["segments"] = segments
+
+    # ADR per person by market segment and room type (mean and sd)
+    report["adr_segment_room"] = stats["adr_pp_per_segment_room"].describe()
+
+    # Cancellations per hotel and per month
+    per_month = stats["cancellations_per_month"].table
+    cancellations = per_month[["sum", "n"]].groupby(level="hotel").sum().astype("int64")
+    cancellations.columns = ["sum", "count"]
+    cancellations["cancel_percent"] = (cancellations["sum"] / cancellations["count"]) * 100
+    report["cancellations"] = cancellations
+    report["total_bookings"] = int(cancellations["count"].sum())
+
+    hotel_data = per_month[["n", "sum"]].astype("int64").reset_index()
+    hotel_data.columns = ["hotel", "arrival_date_month", "total_bookings", "cancellations"]
+    hotel_data["cancel_percent"] = (hotel_data["cancellations"] / hotel_data["total_bookings"]) * 100
+    hotel_data["arrival_date_month"] = _month_categorical(hotel_data["arrival_date_month"])
+    report["hotel_data"] = hotel_data.sort_values(["arrival_date_month", "hotel"]).reset_index(drop=True)
+
+    # Bootstrap confidence intervals of the monthly prices and cancellation rates
+    if stats.bootstrap is not None:
+        report["intervals"] = stats_intervals(stats.bootstrap)
+    return report
+
+
+def report_from_frame(data_cln, sketches=True, intervals=False):
+    """Build the report from a cleaned frame (with "adr_pp" and "total_nights") held in memory."""
+    bootstrap = BootstrapStats(seed=block_seed(0, 0)) if intervals else None
+    stats = ReportStats(sketches=sketches, bootstrap=bootstrap).update(data_cln)
+    with stage("build_report"):
+        return build_report(stats)
+
+
+def print_summary(report):
+    """Print the numbers the script prints, in the same wording."""
+    adr_pp = report["adr_pp_mean"]
+    print("""From all non-cancelled bookings, across all room types and meals, the average prices are:
+Resort hotel: {:.2f} € per night and person.
+City hotel: {:.2f} € per night and person."""
+          .format(adr_pp["Resort Hotel"], adr_pp["City Hotel"]))
+
+    avg_nights, max_nights = report["avg_nights"], report["max_nights"]
+    print(f"On average, guests of the City hotel stay {avg_nights['City Hotel']:.2f} nights, "
+          f"and {max_nights['City Hotel']} at maximum.")
+    print(f"On average, guests of the Resort hotel stay {avg_nights['Resort Hotel']:.2f} nights, "
+          f"and {max_nights['Resort Hotel']} at maximum.")
+
+    cancellations = report["cancellations"]
+    canceled = cancellations["sum"].sum()
+    print(f"Total bookings canceled: {canceled} ({(canceled / report['total_bookings'] * 100):.2f}%)")
+    for hotel, label in zip(HOTELS, ["Resort hotel", "City hotel"]):
+        print(f"{label} bookings canceled: {cancellations.loc[hotel, 'sum']} "
+              f"({cancellations.loc[hotel, 'cancel_percent']:.2f}%)")
@@ -0,0 +1,298 @@
+"""Long-running query service over the cleaned bookings.
+
+``python -m hotel_eda serve hotel_bookings.csv`` loads and cleans the
+bookings once, keeps them in memory and answers the script's analyses for
+any slice over HTTP (on a TCP port, or on a Unix socket with --socket):
+
+    GET /analyses                       names of the analyses
+    GET /status                         rows, data version, cache statistics
+    GET /<analysis>?hotel=City+Hotel&segment=Online+TA&country=PRT
+                    &room_type=A&start=2016-01-01&end=2016-06-30
+
+Every filter takes one value or several separated by commas; start and
+end bound the arrival date (inclusive). The filters are normalized (sorted,
+deduplicated, dates in ISO form) and the report of the slice is kept in a
+bounded LRU cache under them, so every analysis of a slice asked for before
+is answered from memory. Slices are cut with bitmap indexes (see
+hotel_eda.bitmap).
+
+A background thread watches the CSV (or column store) and reloads it when
+it changes; the new data replaces the old in one step, the cache is
+dropped, and requests in flight finish on the data they started with. A
+reload that fails (e.g. on a half-written file) is logged, the old data
+stays in service and the next change is tried again; /status shows the
+last failure.
+"""
+
+import functools
+import json
+import logging
+import os
+import socketserver
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .bitmap import BitmapIndex
+from .cleaning import add_derived, clean_bookings
+from .colstore import ColumnStore
+from .loader import load_bookings
+from .occupancy import arrival_days, nightly_occupancy
+from .report import report_from_frame
+
+# Analysis name -> report table it returns.
+ANALYSES = {
+    "guests_per_country": "country_data",
+    "adr_pp_per_hotel": "adr_pp_mean",
+    "room_prices": "room_price_boxes",
+    "adr_pp_per_month": "grouped",
+    "guests_per_month": "guest_counts",
+    "nights_per_hotel": "nights_data",
+    "average_nights": "avg_nights",
+    "bookings_per_segment": "segments",
+    "adr_pp_per_segment_room": "adr_segment_room",
+    "cancellations_per_hotel": "cancellations",
+    "cancellations_per_month": "hotel_data",
+    "nightly_occupancy": None,
+}
+
+# Query parameter -> column it filters on.
+FILTERS = {
+    "hotel": "hotel",
+    "segment": "market_segment",
+    "room_type": "reserved_room_type",
+    "country": "country",
+}
+DATE_FILTERS = ["start", "end"]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+
+class QueryError(ValueError):
+    """A query the service cannot answer; reported to the client as 400."""
+
+
+def normalize_query(params):
+    """Turn raw query parameters ({name: [values]}) into a hashable, canonical key."""
+    key = []
+    for name in sorted(params):
+        values = [value.strip() for raw in params[name] for value in raw.split(",") if value.strip()]
+        if name in FILTERS:
+            key.append((name, tuple(sorted(set(values)))))
+        elif name in DATE_FILTERS:
+            if len(values) != 1:
+                raise QueryError(f"{name} takes one date")
+            try:
+                key.append((name, str(np.datetime64(values[0], "D"))))
+            except ValueError:
+                raise QueryError(f"{name}: not a date: {values[0]!r}") from None
+        else:
+            raise QueryError(f"Unknown parameter {name!r}; use {sorted(FILTERS) + DATE_FILTERS}")
+    return tuple(key)
+
+
+class _Snapshot:
+    """One loaded version of the bookings with its indexes."""
+
+    def __init__(self, data, version):
+        self.data = data
+        self.version = version
+        self.loaded_at = time.time()
+        self.index = BitmapIndex(data, columns=list(FILTERS.values()))
+        self.arrival = arrival_days(data)
+
+    def select(self, key):
+        predicates, mask = {}, None
+        for name, value in key:
+            if name in FILTERS:
+                predicates[FILTERS[name]] = list(value)
+            else:
+                day = np.datetime64(value, "D").astype("int64")
+                bound = self.arrival >= day if name == "start" else self.arrival <= day
+                mask = bound if mask is None else mask & bound
+        if predicates:
+            selected = self.index.select(**predicates).mask()
+            mask = selected if mask is None else mask & selected
+        return self.data if mask is None else self.data.loc[mask]
+
+
+def _source_version(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, "manifest.json")
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load(path):
+    if os.path.isdir(path):
+        return ColumnStore(path).frame()
+    return add_derived(clean_bookings(load_bookings(path)))
+
+
+def _to_json(value):
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+    if isinstance(value, pd.DataFrame):
+        frame = value
+        if not isinstance(frame.index, pd.RangeIndex):
+            # country_data also keeps its key as a column; do not insert it twice.
+            duplicate = any(name in frame.columns for name in frame.index.names)
+            frame = frame.reset_index(drop=duplicate)
+        if "fliers" in frame:
+            frame = frame.assign(fliers=frame["fliers"].map(list))
+        return json.loads(frame.to_json(orient="records", date_format="iso"))
+    return value
+
+
+class BookingService:
+    """The bookings held in memory, answering analyses of slices through an LRU cache."""
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE, reload_interval=DEFAULT_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._snapshot = _Snapshot(_load(path), _source_version(path))
+        self._cached = functools.lru_cache(maxsize=cache_size)(self._slice_result)
+        self._stop = threading.Event()
+        self._watcher = None
+        self.reload_error = None
+
+    def _slice_result(self, key, snapshot, occupancy):
+        # The snapshot is part of the cache key, so that a reload never
+        # serves a result of the old data.
+        subset = snapshot.select(key)
+        if subset.empty:
+            return {"rows": 0}
+        result = {"occupancy": nightly_occupancy(subset)} if occupancy else report_from_frame(subset)
+        result["rows"] = len(subset)
+        return result
+
+    def query(self, analysis, params):
+        """The JSON-ready answer of one analysis for the slice given by params."""
+        if analysis not in ANALYSES:
+            raise QueryError(f"Unknown analysis {analysis!r}")
+        key = normalize_query(params)
+        table = ANALYSES[analysis]
+        result = self._cached(key, self._snapshot, table is None)
+        value = result.get(table or "occupancy")
+        return {"analysis": analysis, "filters": dict(key), "rows": result["rows"], "result": _to_json(value)}
+
+    def status(self):
+        info = self._cached.cache_info()
+        snapshot = self._snapshot
+        return {"source": os.path.abspath(self.path), "rows": len(snapshot.data),
+                "version": {"size": snapshot.version[0], "mtime_ns": snapshot.version[1]},
+                "loaded_at": snapshot.loaded_at,
+                "cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize,
+                          "max_size": info.maxsize},
+                "reload_error": self.reload_error}
+
+    def reload_if_changed(self):
+        """Load the data again if the source changed; True if it did."""
+        version = _source_version(self.path)
+        if version == self._snapshot.version:
+            return False
+        self._snapshot = _Snapshot(_load(self.path), version)
+        self._cached.cache_clear()
+        self.reload_error = None
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as error:
+                # E.g. a half-written file: keep serving the old data and try again.
+                logger.exception("reload of %s failed", self.path)
+                self.reload_error = {"time": time.time(), "error": f"{type(error).__name__}: {error}"}
+
+    def start_watching(self):
+        if self.reload_interval and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="reload", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.strip("/")
+        try:
+            if name == "analyses":
+                self._reply(200, sorted(ANALYSES))
+            elif name == "status":
+                self._reply(200, self.service.status())
+            elif name not in ANALYSES:
+                self._reply(404, {"error": f"Unknown analysis {name!r}", "analyses": sorted(ANALYSES)})
+            else:
+                self._reply(200, self.service.query(name, parse_qs(url.query)))
+        except QueryError as error:
+            self._reply(400, {"error": str(error)})
+        except Exception as error:
+            self.log_error("%s failed: %r", self.path, error)
+            self._reply(500, {"error": f"{type(error).__name__}: {error}"})
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _remove_stale_socket(path):
+    # A socket left behind by an earlier run is replaced; any other file is not.
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket; not replacing it")
+    os.unlink(path)
+
+
+def make_server(service, host="127.0.0.1", port=8050, socket_path=None):
+    """An HTTP server for service on host:port, or on the Unix socket socket_path."""
+    handler = type("Handler", (_Handler,), {"service": service})
+    if socket_path:
+        _remove_stale_socket(socket_path)
+        return _UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(path, host="127.0.0.1", port=8050, socket_path=None,
+          cache_size=DEFAULT_CACHE_SIZE, reload_interval=DEFAULT_RELOAD_INTERVAL):
+    """Load the bookings and answer queries until interrupted."""
+    service = BookingService(path, cache_size, reload_interval)
+    server = make_server(service, host, port, socket_path)
+    service.start_watching()
+    print(f"serving {service.status()['rows']} bookings on {socket_path or f'http://{host}:{port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop_watching()
+        server.server_close()
+        if socket_path:
+            _remove_stale_socket(socket_path)
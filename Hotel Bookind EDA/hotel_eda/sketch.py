@@ -0,0 +1,219 @@
+"""Mergeable quantile sketches for box plots of large or chunked data.
+
+KLLSketch is a KLL sketch (Karnin, Lang & Liberty, 2016): a stack of
+compactors where level h keeps items that each stand for 2**h values. A full
+level is sorted and every other item, starting at a random offset, moves up
+a level. Memory stays O(k log(n/k)) and two sketches merge by concatenating
+their levels, so chunks and worker partials combine in any order.
+
+BoxSketch adds what a box plot needs on top of the quantiles: the exact
+count, minimum and maximum, and the most extreme values on both sides, from
+which a capped sample of outliers is drawn. GroupSketches keeps one
+BoxSketch per group of a Metric, e.g. per room type and hotel.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import Metric, _key_codes
+
+DEFAULT_ERROR = 0.01
+DEFAULT_OUTLIER_CAP = 200
+
+# Room price per night and person of actual guests, per room type and hotel.
+ROOM_PRICE_METRIC = Metric("adr_pp_per_room", ["reserved_room_type", "hotel"], "adr_pp", stayed_only=True)
+
+# Share of the capacity of level h that level h - 1 gets in KLL.
+_CAPACITY_DECAY = 2 / 3
+
+
+def k_for_error(error):
+    """Smallest k whose normalized rank error is about ``error``.
+
+    Uses the empirical fit published with the Apache DataSketches KLL
+    implementation: error ~= 2.296 / k ** 0.9723.
+    """
+    return max(8, math.ceil((2.296 / error) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    """Approximate quantiles of a stream of floats with bounded memory."""
+
+    def __init__(self, error=DEFAULT_ERROR, seed=None):
+        self.error = error
+        self.k = k_for_error(error)
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        height = len(self.levels)
+        return max(2, math.ceil(self.k * _CAPACITY_DECAY ** (height - level - 1)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind; the rest is halved and promoted.
+                odd = len(items) % 2
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def items(self):
+        """The retained items and their weights."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype="int64")
+                                  for level, items in enumerate(self.levels)])
+        return values, weights
+
+    def quantiles(self, qs):
+        """Approximate quantiles for the probabilities qs (linear interpolation)."""
+        qs = np.asarray(qs, dtype="float64")
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if len(self.levels) == 1:
+            # Nothing was compacted yet: the quantiles are exact.
+            return np.percentile(self.levels[0], qs * 100)
+        values, weights = self.items()
+        order = np.argsort(values)
+        values, weights = values[order], weights[order]
+        # Every item sits in the middle of the rank range it stands for.
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(qs, positions, values)
+
+
+class BoxSketch:
+    """Everything needed to draw one box: quantiles, range and outlier candidates."""
+
+    def __init__(self, error=DEFAULT_ERROR, outlier_cap=DEFAULT_OUTLIER_CAP, seed=None):
+        self.sketch = KLLSketch(error, seed)
+        self.outlier_cap = outlier_cap
+        self.lowest = np.empty(0)
+        self.highest = np.empty(0)
+
+    def _keep_extremes(self, values):
+        cap = self.outlier_cap
+        low = np.concatenate([self.lowest, values])
+        high = np.concatenate([self.highest, values])
+        self.lowest = np.sort(low)[:cap] if len(low) > cap else np.sort(low)
+        self.highest = np.sort(high)[-cap:] if len(high) > cap else np.sort(high)
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[np.isfinite(values)]
+        self.sketch.update(values)
+        self._keep_extremes(values)
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self._keep_extremes(np.concatenate([other.lowest, other.highest]))
+        return self
+
+    def summary(self, whis=1.5):
+        """Box plot statistics in the form matplotlib's Axes.bxp takes.
+
+        The whiskers reach the furthest known value within ``whis`` times the
+        interquartile range, as in matplotlib and seaborn. Outliers are the
+        values beyond the whiskers among the exact extremes and the sketch's
+        retained items, thinned to at most outlier_cap per side.
+        """
+        q1, med, q3 = self.sketch.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        low_fence, high_fence = q1 - whis * iqr, q3 + whis * iqr
+        candidates = np.unique(np.concatenate([self.sketch.items()[0], self.lowest, self.highest]))
+        inside = candidates[(candidates >= low_fence) & (candidates <= high_fence)]
+        whislo = inside.min() if len(inside) else q1
+        whishi = inside.max() if len(inside) else q3
+        fliers = [self._thin(candidates[candidates < low_fence]),
+                  self._thin(candidates[candidates > high_fence])]
+        return {"n": self.sketch.n, "q1": q1, "med": med, "q3": q3,
+                "whislo": whislo, "whishi": whishi, "fliers": np.concatenate(fliers)}
+
+    def _thin(self, values):
+        if len(values) <= self.outlier_cap:
+            return values
+        return values[np.linspace(0, len(values) - 1, self.outlier_cap).round().astype(int)]
+
+
+class GroupSketches:
+    """A BoxSketch per group of a Metric, fed with cleaned frames or chunks."""
+
+    def __init__(self, metric, error=DEFAULT_ERROR, outlier_cap=DEFAULT_OUTLIER_CAP, seed=0):
+        self.metric = metric
+        self.error = error
+        self.outlier_cap = outlier_cap
+        self.seed = seed
+        self.boxes = {}
+
+    def _box(self, key):
+        if key not in self.boxes:
+            self.boxes[key] = BoxSketch(self.error, self.outlier_cap, seed=self.seed + len(self.boxes))
+        return self.boxes[key]
+
+    def update(self, data):
+        keys = [_key_codes(data[key]) for key in self.metric.by]
+        mask = np.ones(len(data), dtype=bool)
+        if self.metric.stayed_only:
+            mask &= data["is_canceled"].to_numpy() == 0
+        for codes, _ in keys:
+            mask &= codes >= 0
+        values = data[self.metric.value].to_numpy(dtype="float64", na_value=np.nan)[mask]
+        dims = [len(labels) for _, labels in keys]
+        group = np.zeros(len(values), dtype="int64")
+        for (codes, _), dim in zip(keys, dims):
+            group *= dim
+            group += codes[mask]
+
+        # Sort once by group and hand every group its slice of values.
+        order = np.argsort(group, kind="stable")
+        groups, starts = np.unique(group[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        for position, flat in enumerate(groups):
+            codes = np.unravel_index(flat, dims)
+            key = tuple(labels[code] for code, (_, labels) in zip(codes, keys))
+            self._box(key).update(values[order[bounds[position]:bounds[position + 1]]])
+        return self
+
+    def merge(self, other):
+        for key, box in other.boxes.items():
+            if key in self.boxes:
+                self.boxes[key].merge(box)
+            else:
+                self.boxes[key] = box
+        return self
+
+    def summary(self, whis=1.5):
+        """One row of box plot statistics per group, ordered by the group keys."""
+        rows = []
+        for key in sorted(self.boxes):
+            row = dict(zip(self.metric.by, key))
+            row.update(self.boxes[key].summary(whis))
+            rows.append(row)
+        return pd.DataFrame(rows)
+
@@ -0,0 +1,41 @@
+"""Chunked reading of the bookings for files larger than memory.
+
+The CSV is read chunk by chunk; every chunk is cleaned with the same rules
+as the in-memory path and folded into a ReportStats, so peak memory depends
+on the chunk size rather than on the number of rows.
+"""
+
+from .bootstrap import BootstrapStats, block_seed
+from .cleaning import add_derived, clean_bookings
+from .loader import read_bookings
+from .profiling import stage
+from .report import ReportStats, build_report
+
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def iter_clean_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, counts=None):
+    """Yield cleaned chunks of the CSV, with "adr_pp" and "total_nights" added.
+
+    The cleaning counts of all chunks are added up in counts if it is a dict.
+    """
+    with read_bookings(file_path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            with stage("clean_chunk", rows=len(chunk)):
+                chunk = add_derived(clean_bookings(chunk, counts))
+            yield chunk
+
+
+def stream_stats(file_path, chunksize=DEFAULT_CHUNKSIZE, sketches=True, intervals=False):
+    """Accumulate the ReportStats of the CSV one chunk at a time (with the bootstrap counts if intervals)."""
+    stats = ReportStats(sketches=sketches, bootstrap=BootstrapStats(seed=block_seed(0, 0)) if intervals else None)
+    for chunk in iter_clean_chunks(file_path, chunksize):
+        stats.update(chunk)
+    return stats
+
+
+def stream_report(file_path, chunksize=DEFAULT_CHUNKSIZE, sketches=True, intervals=False):
+    """Build the report of the CSV without holding it in memory."""
+    stats = stream_stats(file_path, chunksize, sketches, intervals)
+    with stage("build_report"):
+        return build_report(stats)
@@ -0,0 +1,181 @@
+"""Synthetic hotel bookings with the schema and shape of hotel_bookings.csv.
+
+The marginal distributions follow the published sample (~119k bookings,
+July 2015 to August 2017): two thirds City Hotel, cancellation rates of
+about 42% (City) and 28% (Resort), Portugal as the main home country,
+Online TA as the main segment, room type A for most bookings, a summer
+peak, longer stays at the resort and ADR driven by hotel, room type and
+season. The same quirks are kept - missing children, countries, agents and
+companies, "Undefined" meals and bookings without guests - so the cleaning
+steps have something to do.
+
+Rows are generated in independent chunks from spawned seeds, so files of
+100M rows are written with bounded memory and are reproducible.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .loader import MONTHS, SCHEMA
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+HOTELS = {"City Hotel": 0.664, "Resort Hotel": 0.336}
+CANCEL_RATE = {"City Hotel": 0.417, "Resort Hotel": 0.278}
+# Mean nights on weekend and week days per hotel.
+NIGHTS = {"City Hotel": (0.80, 2.18), "Resort Hotel": (1.19, 3.13)}
+BASE_ADR = {"City Hotel": 100.0, "Resort Hotel": 81.0}
+
+COUNTRIES = {
+    "PRT": 0.407, "GBR": 0.102, "FRA": 0.087, "ESP": 0.072, "DEU": 0.061, "ITA": 0.032,
+    "IRL": 0.028, "BEL": 0.020, "BRA": 0.019, "NLD": 0.018, "USA": 0.018, "CHE": 0.015,
+    "CN": 0.011, "AUT": 0.011, "SWE": 0.009, "CHN": 0.008, "POL": 0.008, "ISR": 0.005,
+    "RUS": 0.005, "NOR": 0.005, "ROU": 0.004, "FIN": 0.004, "DNK": 0.004, "AUS": 0.004,
+    "AGO": 0.003, "LUX": 0.002, "MAR": 0.002, "TUR": 0.002, "HUN": 0.002, "ARG": 0.002,
+    "JPN": 0.002, "CZE": 0.001, "IND": 0.001, "KOR": 0.001, "GRC": 0.001, "DZA": 0.001,
+}
+MISSING_COUNTRY = 0.004
+
+SEGMENTS = {
+    "Online TA": 0.473, "Offline TA/TO": 0.203, "Groups": 0.166, "Direct": 0.106,
+    "Corporate": 0.044, "Complementary": 0.006, "Aviation": 0.002,
+}
+CHANNELS = {
+    "Online TA": "TA/TO", "Offline TA/TO": "TA/TO", "Groups": "TA/TO", "Direct": "Direct",
+    "Corporate": "Corporate", "Complementary": "Direct", "Aviation": "Corporate",
+}
+ROOM_TYPES = {"A": 0.720, "D": 0.161, "E": 0.055, "F": 0.024, "G": 0.018, "B": 0.009, "C": 0.008, "H": 0.005}
+# Price multiplier per room type.
+ROOM_ADR = {"A": 0.90, "B": 0.95, "C": 1.45, "D": 1.15, "E": 1.30, "F": 1.60, "G": 1.75, "H": 1.80}
+MEALS = {"BB": 0.773, "HB": 0.121, "SC": 0.089, "Undefined": 0.010, "FB": 0.007}
+ADULTS = {2: 0.751, 1: 0.193, 3: 0.052, 0: 0.003, 4: 0.001}
+CHILDREN = {0: 0.928, 1: 0.041, 2: 0.030, 3: 0.001}
+MISSING_CHILDREN = 0.00004
+BABIES = {0: 0.9923, 1: 0.0075, 2: 0.0002}
+DEPOSITS = {"No Deposit": 0.876, "Non Refund": 0.122, "Refundable": 0.002}
+CUSTOMERS = {"Transient": 0.750, "Transient-Party": 0.210, "Contract": 0.034, "Group": 0.006}
+MISSING_AGENT = 0.137
+MISSING_COMPANY = 0.943
+
+# Arrivals per month (seasonality) and the months covered per year.
+MONTH_WEIGHTS = [0.050, 0.068, 0.082, 0.093, 0.099, 0.092, 0.106, 0.116, 0.088, 0.093, 0.057, 0.057]
+YEAR_MONTHS = {2015: range(6, 12), 2016: range(0, 12), 2017: range(0, 8)}
+# Seasonal price factor per month.
+MONTH_ADR = [0.70, 0.75, 0.80, 0.90, 0.95, 1.10, 1.25, 1.35, 1.05, 0.85, 0.70, 0.75]
+
+
+def _choice(rng, table, size):
+    keys = list(table)
+    p = np.array(list(table.values()), dtype="float64")
+    return np.array(keys, dtype=object)[rng.choice(len(keys), size=size, p=p / p.sum())]
+
+
+def _arrivals(rng, size):
+    # (year, month) pairs weighted by the month's seasonality.
+    pairs = [(year, month) for year, months in YEAR_MONTHS.items() for month in months]
+    weights = np.array([MONTH_WEIGHTS[month] for _, month in pairs])
+    picked = rng.choice(len(pairs), size=size, p=weights / weights.sum())
+    years = np.array([year for year, _ in pairs])[picked]
+    months = np.array([month for _, month in pairs])[picked]
+    first = pd.to_datetime({"year": years, "month": months + 1, "day": 1})
+    days = rng.integers(0, first.dt.days_in_month.to_numpy())
+    return first + pd.to_timedelta(days, unit="D")
+
+
+def generate_bookings(n_rows, seed=0):
+    """A frame of n_rows synthetic bookings with the columns of hotel_bookings.csv."""
+    rng = np.random.default_rng(seed)
+    hotel = _choice(rng, HOTELS, n_rows)
+    is_city = hotel == "City Hotel"
+
+    cancel_rate = np.where(is_city, CANCEL_RATE["City Hotel"], CANCEL_RATE["Resort Hotel"])
+    is_canceled = (rng.random(n_rows) < cancel_rate).astype("int8")
+    weekend_mean = np.where(is_city, NIGHTS["City Hotel"][0], NIGHTS["Resort Hotel"][0])
+    week_mean = np.where(is_city, NIGHTS["City Hotel"][1], NIGHTS["Resort Hotel"][1])
+    weekend_nights = rng.poisson(weekend_mean)
+    week_nights = rng.poisson(week_mean)
+
+    arrival = _arrivals(rng, n_rows)
+    lead_time = np.minimum(rng.gamma(0.9, 115.0, n_rows).astype("int64"), 737)
+    segment = _choice(rng, SEGMENTS, n_rows)
+    room = _choice(rng, ROOM_TYPES, n_rows)
+    assigned = np.where(rng.random(n_rows) < 0.875, room, _choice(rng, ROOM_TYPES, n_rows))
+
+    adults = _choice(rng, ADULTS, n_rows).astype("int64")
+    children = _choice(rng, CHILDREN, n_rows).astype("float64")
+    babies = _choice(rng, BABIES, n_rows).astype("int64")
+    # Bookings for children only are rare; most 0-adult rows carry a child.
+    lonely = (adults == 0) & (children == 0) & (rng.random(n_rows) < 0.6)
+    children[lonely] = 1
+    babies[(adults == 0) & (children == 0)] = 0
+    children[rng.random(n_rows) < MISSING_CHILDREN] = np.nan
+
+    room_factor = pd.Series(room).map(ROOM_ADR).to_numpy(dtype="float64")
+    month_factor = np.array(MONTH_ADR)[arrival.dt.month.to_numpy() - 1]
+    base = np.where(is_city, BASE_ADR["City Hotel"], BASE_ADR["Resort Hotel"])
+    adr = base * room_factor * month_factor * rng.lognormal(0.0, 0.25, n_rows)
+    adr[segment == "Complementary"] = 0.0
+    adr = np.round(adr, 2)
+
+    country = _choice(rng, COUNTRIES, n_rows)
+    country[rng.random(n_rows) < MISSING_COUNTRY] = None
+    agent = rng.integers(1, 536, n_rows).astype("float64")
+    agent[rng.random(n_rows) < MISSING_AGENT] = np.nan
+    company = rng.integers(6, 544, n_rows).astype("float64")
+    company[rng.random(n_rows) < MISSING_COMPANY] = np.nan
+
+    stay = pd.to_timedelta(weekend_nights + week_nights, unit="D")
+    before = pd.to_timedelta((lead_time * rng.random(n_rows)).astype("int64"), unit="D")
+    status = np.where(is_canceled == 1,
+                      np.where(rng.random(n_rows) < 0.96, "Canceled", "No-Show"), "Check-Out")
+    status_date = np.where(is_canceled == 1, arrival - before, arrival + stay)
+
+    return pd.DataFrame({
+        "hotel": hotel,
+        "is_canceled": is_canceled,
+        "lead_time": lead_time,
+        "arrival_date_year": arrival.dt.year.to_numpy(),
+        "arrival_date_month": np.array(MONTHS, dtype=object)[arrival.dt.month.to_numpy() - 1],
+        "arrival_date_week_number": arrival.dt.isocalendar().week.to_numpy(dtype="int64"),
+        "arrival_date_day_of_month": arrival.dt.day.to_numpy(),
+        "stays_in_weekend_nights": weekend_nights,
+        "stays_in_week_nights": week_nights,
+        "adults": adults,
+        "children": children,
+        "babies": babies,
+        "meal": _choice(rng, MEALS, n_rows),
+        "country": country,
+        "market_segment": segment,
+        "distribution_channel": pd.Series(segment).map(CHANNELS).to_numpy(),
+        "is_repeated_guest": (rng.random(n_rows) < 0.032).astype("int8"),
+        "previous_cancellations": rng.poisson(0.087, n_rows),
+        "previous_bookings_not_canceled": rng.poisson(0.137, n_rows),
+        "reserved_room_type": room,
+        "assigned_room_type": assigned,
+        "booking_changes": rng.poisson(0.22, n_rows),
+        "deposit_type": _choice(rng, DEPOSITS, n_rows),
+        "agent": agent,
+        "company": company,
+        "days_in_waiting_list": np.where(rng.random(n_rows) < 0.03, rng.integers(1, 392, n_rows), 0),
+        "customer_type": _choice(rng, CUSTOMERS, n_rows),
+        "adr": adr,
+        "required_car_parking_spaces": (rng.random(n_rows) < 0.062).astype("int8"),
+        "total_of_special_requests": rng.poisson(0.57, n_rows),
+        "reservation_status": status,
+        "reservation_status_date": pd.DatetimeIndex(status_date).strftime("%Y-%m-%d"),
+    }, columns=list(SCHEMA))
+
+
+def write_bookings_csv(path, n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write n_rows synthetic bookings to a CSV, one chunk of rows at a time.
+
+    Missing values are written as "NULL", like in the original file.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_rows // chunk_rows))
+    written = 0
+    for chunk_seed in seeds:
+        rows = min(chunk_rows, n_rows - written)
+        generate_bookings(rows, seed=chunk_seed).to_csv(
+            path, mode="w" if written == 0 else "a", header=written == 0, index=False, na_rep="NULL")
+        written += rows
+    return path
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+# The package is not installed; import it from the directory above.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hotel_eda.synth import write_bookings_csv  # noqa: E402
+
+ROWS = 20_000
+
+
+@pytest.fixture(scope="session")
+def bookings_csv(tmp_path_factory):
+    """A small synthetic bookings CSV (see hotel_eda.synth)."""
+    path = tmp_path_factory.mktemp("bookings") / "hotel_bookings.csv"
+    write_bookings_csv(str(path), ROWS, seed=3)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def data_cln(bookings_csv):
+    from hotel_eda import add_derived, clean_bookings, load_bookings
+    return add_derived(clean_bookings(load_bookings(bookings_csv, cache=False)))
+
+
+@pytest.fixture(scope="session")
+def expected_report(data_cln):
+    """The report of the bookings held in memory, which every other path must give."""
+    from hotel_eda import report_from_frame
+    return report_from_frame(data_cln)
+
+
+@pytest.fixture(scope="session")
+def check_room_price_boxes(data_cln):
+    """A check that sketched box plot quantiles are within the sketch's rank error of the data's."""
+    import numpy as np
+
+    from hotel_eda.sketch import DEFAULT_ERROR
+
+    stayed = data_cln.loc[data_cln["is_canceled"] == 0]
+    groups = {key: np.sort(group["adr_pp"].dropna().to_numpy(dtype="float64"))
+              for key, group in stayed.groupby(["reserved_room_type", "hotel"], observed=True)}
+
+    def check(boxes, error=DEFAULT_ERROR):
+        assert sorted(zip(boxes["reserved_room_type"], boxes["hotel"])) == sorted(key for key, values
+                                                                                 in groups.items() if len(values))
+        for box in boxes.itertuples():
+            values = groups[(box.reserved_room_type, box.hotel)]
+            assert box.n == len(values)
+            for q, value in [(0.25, box.q1), (0.5, box.med), (0.75, box.q3)]:
+                # The value's normalized rank is an interval when it occurs several
+                # times; one item of slack allows for the choice between neighbours.
+                low = np.searchsorted(values, value, "left") / len(values)
+                high = np.searchsorted(values, value, "right") / len(values)
+                slack = error + 1 / len(values)
+                assert low - slack <= q <= high + slack, (box.reserved_room_type, box.hotel, q)
+    return check
+
+
+@pytest.fixture(scope="session")
+def check_report(expected_report, check_room_price_boxes):
+    """A check that a report equals the in-memory one, up to the sketch error of the box plot."""
+    from hotel_eda.backends import compare_tables
+
+    def check(report):
+        assert report.keys() == expected_report.keys()
+        for table, value in expected_report.items():
+            if table == "room_price_boxes":
+                check_room_price_boxes(report[table])
+            else:
+                assert compare_tables(value, report[table]) is None, table
+    return check
@@ -0,0 +1,33 @@
+"""Every installed dataframe backend gives the report of the pandas path."""
+
+import pytest
+
+from hotel_eda.backends import HAVE_POLARS, PolarsBackend, check_parity, compare_tables, get_backend
+from hotel_eda.report import report_from_frame
+
+needs_polars = pytest.mark.skipif(not HAVE_POLARS, reason="polars is not installed")
+
+
+def _assert_same_report(expected, report):
+    assert report.keys() == expected.keys()
+    for table, value in expected.items():
+        assert compare_tables(value, report[table]) is None, table
+
+
+def test_pandas_backend_matches_script_path(bookings_csv, data_cln):
+    report = get_backend("pandas", cache=False).report(bookings_csv)
+    _assert_same_report(report_from_frame(data_cln, sketches=False), report)
+
+
+@needs_polars
+@pytest.mark.parametrize("shared_scan", [True, False])
+def test_polars_matches_pandas(bookings_csv, shared_scan):
+    expected = get_backend("pandas", cache=False).report(bookings_csv)
+    _assert_same_report(expected, PolarsBackend(shared_scan=shared_scan).report(bookings_csv))
+
+
+@needs_polars
+def test_check_parity(bookings_csv):
+    parity = check_parity(bookings_csv)
+    assert set(parity["backend"]) == {"polars"}
+    assert parity["equal"].all(), parity.loc[~parity["equal"]].to_string()
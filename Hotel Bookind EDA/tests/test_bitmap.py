@@ -0,0 +1,76 @@
+"""A bitmap index slice equals the boolean mask filter of the same frame."""
+
+import json
+
+import numpy as np
+import pytest
+
+from hotel_eda.bitmap import BitmapIndex
+from hotel_eda.cli import main
+from hotel_eda.colstore import ColumnStore, write_column_store
+
+
+@pytest.fixture(scope="module")
+def store_frame(bookings_csv, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("store") / "hotel_bookings.store")
+    write_column_store(bookings_csv, path, chunksize=6_000)
+    return ColumnStore(path).frame()
+
+
+@pytest.fixture(scope="module", params=["csv", "store"])
+def frame(request, data_cln, store_frame):
+    return data_cln if request.param == "csv" else store_frame
+
+
+def _slices(data):
+    # Dense values, a union of values, a rare value (kept as a row list) and a missing one.
+    rare = data["country"].value_counts().loc[lambda counts: counts > 0].index[-1]
+    return [
+        {},
+        {"hotel": "City Hotel"},
+        {"hotel": "Resort Hotel", "is_canceled": 0},
+        {"country": ["PRT", "ESP"], "market_segment": "Online TA"},
+        {"country": rare, "hotel": "City Hotel"},
+        {"country": [rare, "PRT"], "is_canceled": 1},
+        {"country": "ZZZ"},
+    ]
+
+
+def _mask(data, predicates):
+    mask = np.ones(len(data), dtype=bool)
+    for column, values in predicates.items():
+        mask &= data[column].isin(values if isinstance(values, list) else [values]).to_numpy()
+    return mask
+
+
+def test_count_equals_mask(frame):
+    index = BitmapIndex(frame)
+    for predicates in _slices(frame):
+        mask = _mask(frame, predicates)
+        assert index.count(**predicates) == mask.sum(), predicates
+        assert np.array_equal(index.select(**predicates).mask(), mask), predicates
+
+
+def test_aggregate_equals_mask(frame):
+    index = BitmapIndex(frame)
+    for predicates in _slices(frame):
+        values = frame.loc[_mask(frame, predicates), "adr"].dropna().astype("float64")
+        result = index.aggregate("adr", **predicates)
+        assert result["rows"] == _mask(frame, predicates).sum(), predicates
+        assert result["count"] == len(values), predicates
+        assert result["sum"] == pytest.approx(values.sum(), rel=1e-9), predicates
+        if len(values):
+            assert result["mean"] == pytest.approx(values.mean(), rel=1e-9), predicates
+        else:
+            assert np.isnan(result["mean"]), predicates
+
+
+def test_query_of_empty_slice_is_json(bookings_csv, capsys):
+    main(["query", bookings_csv, "--where", "country=ZZZ", "--value", "adr", "--no-cache"])
+    assert json.loads(capsys.readouterr().out) == {"rows": 0, "count": 0, "sum": 0.0, "mean": None}
+
+
+@pytest.mark.parametrize("where", ["country", "country=", "=PRT", "colour=red"])
+def test_query_rejects_bad_conditions(bookings_csv, where):
+    with pytest.raises(SystemExit):
+        main(["query", bookings_csv, "--where", where, "--no-cache"])
@@ -0,0 +1,48 @@
+"""Bootstrap intervals are the same however the rows were counted."""
+
+import pytest
+
+from hotel_eda.bootstrap import bootstrap_intervals, bucket_stats
+from hotel_eda.parallel import parallel_stats
+from hotel_eda.report import build_report, report_from_frame
+from hotel_eda.streaming import stream_report
+
+
+def test_bucket_counts_do_not_depend_on_workers(data_cln, monkeypatch):
+    from hotel_eda import bootstrap
+
+    # Several blocks, counted in this process and on a pool.
+    monkeypatch.setattr(bootstrap, "_ROW_BLOCK", 6_000)
+    serial = bucket_stats(data_cln)
+    pooled = bucket_stats(data_cln, workers=2)
+    for name, stat in serial.stats.items():
+        assert stat.table.equals(pooled.stats[name].table)
+    intervals = bootstrap_intervals(data_cln, replicates=200, workers=2)
+    assert set(intervals) == {"adr_pp_per_month", "cancellations_per_month"}
+
+
+@pytest.fixture(scope="module")
+def expected(data_cln):
+    return report_from_frame(data_cln, intervals=True)["intervals"]
+
+
+@pytest.mark.parametrize("path", ["chunked", "parallel"])
+def test_report_paths_carry_the_intervals(path, bookings_csv, expected):
+    if path == "chunked":
+        report = stream_report(bookings_csv, 6_000, intervals=True)
+    else:
+        report = build_report(parallel_stats(bookings_csv, workers=2, partition_bytes=512 << 10, intervals=True))
+    for name, table in expected.items():
+        intervals = report["intervals"][name]
+        assert intervals["count"].tolist() == table["count"].tolist()
+        assert intervals["estimate"].tolist() == pytest.approx(table["estimate"].tolist(), rel=1e-9)
+        assert (intervals["lower"] <= intervals["estimate"]).all()
+        assert (intervals["estimate"] <= intervals["upper"]).all()
+
+
+def test_parallel_intervals_do_not_depend_on_workers(bookings_csv):
+    reports = [build_report(parallel_stats(bookings_csv, workers=workers, partition_bytes=512 << 10,
+                                           intervals=True))
+               for workers in [1, 2]]
+    for name, table in reports[0]["intervals"].items():
+        assert table.equals(reports[1]["intervals"][name])
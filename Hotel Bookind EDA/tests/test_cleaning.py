@@ -0,0 +1,31 @@
+"""The cleaning rules give the same rows however the bookings were read."""
+
+import pandas as pd
+import pytest
+
+from hotel_eda.cleaning import clean_bookings
+from hotel_eda.loader import load_bookings, read_bookings
+
+
+def test_plain_read_csv_frame(bookings_csv):
+    expected = clean_bookings(load_bookings(bookings_csv, cache=False))
+    cleaned = clean_bookings(pd.read_csv(bookings_csv))
+    assert len(cleaned) == len(expected)
+    for name in ["children", "agent", "company", "country", "meal"]:
+        assert cleaned[name].astype(str).tolist() == expected[name].astype(str).tolist(), name
+
+
+def test_unconvertible_column(bookings_csv):
+    data = pd.read_csv(bookings_csv, nrows=10).assign(adults="two")
+    with pytest.raises(ValueError, match="adults"):
+        clean_bookings(data)
+
+
+def test_chunk_counts_add_up(bookings_csv):
+    counts = {}
+    clean_bookings(load_bookings(bookings_csv, cache=False), counts)
+    chunk_counts = {}
+    with read_bookings(bookings_csv, chunksize=6_000) as reader:
+        for chunk in reader:
+            clean_bookings(chunk, chunk_counts)
+    assert chunk_counts == counts
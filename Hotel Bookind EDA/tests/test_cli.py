@@ -0,0 +1,27 @@
+"""Command line options that cannot work together are rejected up front."""
+
+import pytest
+
+from hotel_eda.backends import HAVE_POLARS
+from hotel_eda.cli import main
+
+
+@pytest.mark.parametrize("flags", [["--chunksize", "1000"], ["--workers", "2"], ["--no-cache"]])
+def test_stats_backend_rejects_pandas_flags(bookings_csv, flags, capsys):
+    with pytest.raises(SystemExit):
+        main(["stats", bookings_csv, "--backend", "polars", *flags])
+    assert "cannot be used with --backend polars" in capsys.readouterr().err
+
+
+def test_shared_scan_needs_polars(bookings_csv, capsys):
+    with pytest.raises(SystemExit):
+        main(["stats", bookings_csv, "--no-shared-scan"])
+    assert "--no-shared-scan needs --backend polars" in capsys.readouterr().err
+
+
+@pytest.mark.skipif(not HAVE_POLARS, reason="polars is not installed")
+def test_stats_without_shared_scan(bookings_csv, capsys):
+    main(["stats", bookings_csv])
+    expected = capsys.readouterr().out
+    main(["stats", bookings_csv, "--backend", "polars", "--no-shared-scan"])
+    assert capsys.readouterr().out == expected
@@ -0,0 +1,58 @@
+"""The column store holds the cleaned bookings and gives the same report."""
+
+import os
+
+import pytest
+
+from hotel_eda.colstore import ColumnStore, store_report, store_stats, write_column_store
+from hotel_eda.report import build_report
+
+CHUNKSIZE = 6_000
+
+
+@pytest.fixture(scope="module")
+def store(bookings_csv, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("store") / "hotel_bookings.store")
+    write_column_store(bookings_csv, path, chunksize=CHUNKSIZE)
+    return path
+
+
+def test_frame_equals_cleaned_bookings(store, data_cln):
+    frame = ColumnStore(store).frame()
+    assert list(frame.columns) == list(data_cln.columns)
+    for name in data_cln.columns:
+        assert frame[name].astype(str).tolist() == data_cln[name].astype(str).tolist(), name
+
+
+def test_store_report(store, check_report):
+    check_report(store_report(store))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_store_report_of_row_ranges(store, workers, check_report):
+    check_report(build_report(store_stats(store, workers, partition_rows=CHUNKSIZE)))
+
+
+def test_refuses_to_replace_other_directories(bookings_csv, tmp_path):
+    out = tmp_path / "notes"
+    out.mkdir()
+    (out / "notes.txt").write_text("keep me")
+    with pytest.raises(FileExistsError):
+        write_column_store(bookings_csv, str(out))
+    assert (out / "notes.txt").read_text() == "keep me"
+
+    with pytest.raises(FileExistsError):
+        write_column_store(bookings_csv, str(out / "notes.txt"))
+
+
+def test_replaces_empty_directory_and_earlier_store(bookings_csv, data_cln, tmp_path):
+    out = tmp_path / "store"
+    out.mkdir()
+    for _ in range(2):
+        write_column_store(bookings_csv, str(out), chunksize=CHUNKSIZE)
+        assert ColumnStore(str(out)).rows == len(data_cln)
+    # An interrupted conversion leaves column files behind; they are replaced too.
+    os.makedirs(str(out) + ".tmp")
+    open(os.path.join(str(out) + ".tmp", "hotel.bin"), "wb").close()
+    write_column_store(bookings_csv, str(out), chunksize=CHUNKSIZE)
+    assert not os.path.exists(str(out) + ".tmp")
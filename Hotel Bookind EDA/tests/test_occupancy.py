@@ -0,0 +1,70 @@
+"""Nightly occupancy from difference arrays equals expanding every stay night by night."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hotel_eda.occupancy import NightlyOccupancy, arrival_days, nightly_occupancy
+
+
+def _expanded(data_cln):
+    # One row per booking and night it occupies, summed per hotel and night.
+    stayed = data_cln.loc[data_cln["is_canceled"] == 0]
+    nights = (stayed["stays_in_weekend_nights"].astype("int64") + stayed["stays_in_week_nights"]).to_numpy()
+    rows = np.repeat(np.arange(len(stayed)), nights)
+    offset = np.arange(len(rows)) - np.repeat(np.cumsum(nights) - nights, nights)
+    night = (arrival_days(stayed)[rows] + offset).astype("datetime64[D]")
+    guests = (stayed["adults"].astype("float64") + stayed["children"].fillna(0) + stayed["babies"]).to_numpy()
+    frame = pd.DataFrame({"hotel": stayed["hotel"].astype(str).to_numpy()[rows], "night": night,
+                          "rooms": 1, "guests": guests[rows], "revenue": stayed["adr"].to_numpy("float64")[rows]})
+    return frame.groupby(["hotel", "night"], as_index=False).sum()
+
+
+def _occupied(nightly):
+    occupied = nightly.loc[nightly["rooms"] > 0, ["hotel", "night", "rooms", "guests", "revenue"]]
+    occupied = occupied.assign(hotel=occupied["hotel"].astype(str))
+    return occupied.sort_values(["hotel", "night"]).reset_index(drop=True)
+
+
+def _assert_equal(expected, nightly):
+    actual = _occupied(nightly)
+    assert actual[["hotel", "night"]].equals(expected[["hotel", "night"]])
+    assert actual["rooms"].tolist() == expected["rooms"].tolist()
+    assert actual["guests"].tolist() == expected["guests"].astype("int64").tolist()
+    np.testing.assert_allclose(actual["revenue"], expected["revenue"], rtol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def expected(data_cln):
+    return _expanded(data_cln)
+
+
+def test_equals_expansion(data_cln, expected):
+    nightly = nightly_occupancy(data_cln)
+    _assert_equal(expected, nightly)
+    # Every night between the first and the last is there, empty or not.
+    for _, nights in nightly.groupby("hotel", observed=True)["night"]:
+        assert (np.diff(nights.to_numpy()) == np.timedelta64(1, "D")).all()
+
+
+def test_merge_equals_expansion(data_cln, expected):
+    # The parts cover different date ranges, so merging has to grow the arrays on both sides.
+    late = arrival_days(data_cln) > np.median(arrival_days(data_cln))
+    parts = [data_cln.loc[late].iloc[::2], data_cln.loc[~late], data_cln.loc[late].iloc[1::2]]
+    occupancy = NightlyOccupancy()
+    for part in parts:
+        occupancy.merge(NightlyOccupancy().update(part))
+    _assert_equal(expected, occupancy.nightly())
+
+
+def test_arrival_days_of_month_names(data_cln):
+    expected = pd.to_datetime(data_cln["arrival_date_year"].astype(str) + "-"
+                              + data_cln["arrival_date_month"].astype(str) + "-"
+                              + data_cln["arrival_date_day_of_month"].astype(str), format="%Y-%B-%d")
+    expected = expected.to_numpy().astype("datetime64[D]").astype("int64")
+    reordered = data_cln["arrival_date_month"].cat.reorder_categories(
+        sorted(data_cln["arrival_date_month"].cat.categories))
+    for month in [data_cln["arrival_date_month"], reordered, data_cln["arrival_date_month"].astype(str)]:
+        assert (arrival_days(data_cln.assign(arrival_date_month=month)) == expected).all()
+    with pytest.raises(ValueError, match="Jan"):
+        arrival_days(data_cln.iloc[:2].assign(arrival_date_month=["Jan", "March"]))
@@ -0,0 +1,32 @@
+"""The report computed by a pool of workers equals the in-memory report."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from hotel_eda.parallel import csv_partitions, parallel_stats, parallel_stats_frame
+from hotel_eda.report import build_report
+
+# Several byte ranges per worker for the 20,000-row file.
+PARTITION_BYTES = 512 << 10
+
+
+def test_partitions_cover_the_body_on_line_breaks(bookings_csv):
+    ranges = csv_partitions(bookings_csv, PARTITION_BYTES)
+    assert len(ranges) > 2
+    with open(bookings_csv, "rb") as fh:
+        header = len(fh.readline())
+        body = fh.read()
+    assert ranges[0][0] == header and ranges[-1][1] == os.path.getsize(bookings_csv)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(body[end - header - 1:end - header] == b"\n" for _, end in ranges)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_report(bookings_csv, workers, check_report):
+    check_report(build_report(parallel_stats(bookings_csv, workers, PARTITION_BYTES)))
+
+
+def test_parallel_report_of_frame(bookings_csv, check_report):
+    check_report(build_report(parallel_stats_frame(pd.read_csv(bookings_csv), workers=2)))
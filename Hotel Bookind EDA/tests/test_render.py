@@ -0,0 +1,28 @@
+"""Rendered figures are cached by their input, even when another figure fails."""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("seaborn")
+
+from hotel_eda.render import _CACHE_FILE, render_report  # noqa: E402
+
+FIGURES = ["country_bar", "segment_pie", "stay_length_stackplot"]
+
+
+def test_failed_figure_keeps_the_others_cached(expected_report, tmp_path):
+    out = str(tmp_path)
+    broken = {**expected_report, "segments": pd.DataFrame({"colour": ["red"]})}
+    with pytest.raises(Exception):
+        render_report(broken, out, formats=("png",), workers=1, figures=FIGURES)
+    with open(os.path.join(out, _CACHE_FILE)) as fh:
+        assert sorted(json.load(fh)) == ["country_bar", "stay_length_stackplot"]
+
+    status = render_report(expected_report, out, formats=("png",), workers=1, figures=FIGURES)
+    assert status == {"country_bar": "cached", "segment_pie": "rendered", "stay_length_stackplot": "cached"}
+    status = render_report(expected_report, out, formats=("png",), workers=1, figures=FIGURES)
+    assert set(status.values()) == {"cached"}
@@ -0,0 +1,123 @@
+"""The query service answers every analysis of a slice as JSON."""
+
+import json
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from hotel_eda.service import ANALYSES, BookingService, QueryError, make_server
+
+
+@pytest.fixture(scope="module")
+def service(bookings_csv):
+    return BookingService(bookings_csv, reload_interval=0)
+
+
+@pytest.fixture(scope="module")
+def url(service):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+@pytest.mark.parametrize("analysis", sorted(ANALYSES))
+def test_every_analysis_is_json(service, analysis):
+    answer = service.query(analysis, {"hotel": ["City Hotel"], "start": ["2016-01-01"]})
+    assert answer["rows"] > 0
+    json.dumps(answer, default=str)
+
+
+def test_guests_per_country(service, data_cln):
+    answer = service.query("guests_per_country", {})
+    stayed = data_cln.loc[data_cln["is_canceled"] == 0]
+    assert sum(row["Number of Guests"] for row in answer["result"]) == len(stayed)
+    assert all("country" in row for row in answer["result"])
+
+
+def test_slice_rows(service, data_cln):
+    answer = service.query("bookings_per_segment", {"hotel": ["Resort Hotel"], "country": ["PRT,ESP"]})
+    expected = data_cln["hotel"].eq("Resort Hotel") & data_cln["country"].isin(["PRT", "ESP"])
+    assert answer["rows"] == int(expected.sum())
+
+
+def test_bad_queries(service):
+    with pytest.raises(QueryError):
+        service.query("no_such_analysis", {})
+    with pytest.raises(QueryError):
+        service.query("bookings_per_segment", {"colour": ["red"]})
+    with pytest.raises(QueryError):
+        service.query("bookings_per_segment", {"start": ["not a date"]})
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_reload_survives_a_broken_file(bookings_csv, tmp_path):
+    path = tmp_path / "bookings.csv"
+    shutil.copy(bookings_csv, path)
+    service = BookingService(str(path), reload_interval=0.02)
+    rows = service.status()["rows"]
+    service.start_watching()
+    try:
+        # A rewrite that lost a column fails to load; the watcher keeps going.
+        pd.read_csv(bookings_csv).drop(columns="hotel").to_csv(path, index=False)
+        assert _wait_for(lambda: service.status()["reload_error"] is not None)
+        assert "hotel" in service.status()["reload_error"]["error"]
+        assert service.status()["rows"] == rows
+
+        pd.read_csv(bookings_csv).iloc[:1000].to_csv(path, index=False)
+        assert _wait_for(lambda: service.status()["reload_error"] is None)
+        assert service.status()["rows"] < rows
+    finally:
+        service.stop_watching()
+
+
+def test_socket_path_that_is_not_a_socket(service, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        make_server(service, socket_path=str(path))
+    assert path.read_text() == "keep me"
+
+    server = make_server(service, socket_path=str(tmp_path / "service.sock"))
+    server.server_close()
+    # A socket left behind by an earlier run is replaced.
+    make_server(service, socket_path=str(tmp_path / "service.sock")).server_close()
+
+
+def test_http_statuses(url, service, monkeypatch):
+    status, body = _get(f"{url}/analyses")
+    assert status == 200 and body == sorted(ANALYSES)
+    status, body = _get(f"{url}/status")
+    assert status == 200 and body["rows"] > 0
+    status, body = _get(f"{url}/guests_per_country?hotel=City+Hotel")
+    assert status == 200 and body["result"]
+    assert _get(f"{url}/no_such_analysis")[0] == 404
+    assert _get(f"{url}/bookings_per_segment?colour=red")[0] == 400
+
+    def fail(analysis, params):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(service, "query", fail)
+    status, body = _get(f"{url}/bookings_per_segment")
+    assert status == 500 and body == {"error": "RuntimeError: broken"}
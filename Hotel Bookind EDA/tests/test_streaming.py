@@ -0,0 +1,16 @@
+"""The report of the CSV read chunk by chunk equals the report of the whole file."""
+
+import pytest
+
+from hotel_eda.report import build_report
+from hotel_eda.streaming import stream_report, stream_stats
+
+
+@pytest.mark.parametrize("chunksize", [1_000, 6_000, 50_000])
+def test_chunked_report(bookings_csv, chunksize, check_report):
+    check_report(stream_report(bookings_csv, chunksize))
+
+
+def test_chunked_report_without_sketches(bookings_csv, expected_report):
+    report = build_report(stream_stats(bookings_csv, 6_000, sketches=False))
+    assert set(expected_report) - set(report) == {"room_price_boxes"}